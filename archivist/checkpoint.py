@@ -0,0 +1,114 @@
+"""Per-URL progress of a pipeline run, kept in a small local SQLite file.
+
+Used by main.py --resume: a run that died halfway (e.g. GitHub Actions
+timeout) continues where it stopped instead of re-checking and
+re-downloading everything. Once a run completes, the next one starts fresh.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (stage, key)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    snap_url TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    ts TEXT,
+    status TEXT NOT NULL DEFAULT 'PENDING'
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_url ON snapshots (url);
+"""
+
+
+class PipelineState:
+    def __init__(self, path, resume=False):
+        self.path = path
+        # Shared by the retriever's worker threads, so every access goes through _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        # Nothing to resume if the previous run finished
+        self.resumed = resume and self.get("pipeline", "run") == "RUNNING"
+        if not self.resumed:
+            self.reset()
+        self.mark("pipeline", "run", "RUNNING")
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN ... COMMIT under _lock; rolled back on error so the shared connection never stays inside BEGIN"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM progress")
+            self._conn.execute("DELETE FROM snapshots")
+
+    def get(self, stage, key):
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM progress WHERE stage=? AND key=?", (stage, key)).fetchone()
+        return row[0] if row else None
+
+    def get_all(self, stage):
+        with self._lock:
+            rows = self._conn.execute("SELECT key, status FROM progress WHERE stage=?", (stage,)).fetchall()
+        return dict(rows)
+
+    def mark(self, stage, key, status):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO progress (stage, key, status, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (stage, key) DO UPDATE SET status=excluded.status, updated_at=excluded.updated_at",
+                (stage, key, status, time.time()))
+
+    def mark_many(self, stage, items):
+        """items: [(key, status), ...] in one transaction"""
+        now = time.time()
+        with self._transaction():
+            self._conn.executemany(
+                "INSERT INTO progress (stage, key, status, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (stage, key) DO UPDATE SET status=excluded.status, updated_at=excluded.updated_at",
+                [(stage, key, status, now) for key, status in items])
+
+    def add_snapshots(self, url, snapshots):
+        """Stores the CDX result for url and marks its lookup as done"""
+        with self._transaction():
+            self._conn.executemany("INSERT OR IGNORE INTO snapshots (snap_url, url, ts) VALUES (?, ?, ?)",
+                                   [(snap_url, url, ts) for ts, snap_url in snapshots])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO progress (stage, key, status, updated_at) VALUES ('cdx', ?, 'DONE', ?)",
+                (url, time.time()))
+
+    def pending_snapshots(self, url):
+        with self._lock:
+            # CDX order, which the retriever keeps when writing records
+            rows = self._conn.execute("SELECT ts, snap_url FROM snapshots WHERE url=? AND status != 'DONE' "
+                                      "ORDER BY ts", (url,)).fetchall()
+        return rows
+
+    def mark_snapshot(self, snap_url, status="DONE"):
+        with self._lock:
+            self._conn.execute("UPDATE snapshots SET status=? WHERE snap_url=?", (status, snap_url))
+
+    def finish(self):
+        self.mark("pipeline", "run", "DONE")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
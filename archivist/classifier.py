@@ -0,0 +1,56 @@
+"""Content category (Code / Academic / News / Forum / General) of cleaned_text.
+
+Scores are identical to the original DBConnector._detect_category. Literal
+indicators are still counted with str.count(): on CPython its C substring
+search runs at ~1 GB/s, while one alternation regex over all patterns goes
+through the sre engine character by character and measured about 2x slower
+than all the counts together (see benchmarks/bench_classifier.py). The year
+regex, which cost about as much as all the counts, is rewritten so sre can
+skip ahead to the "19"/"20" prefix.
+
+Runs in worker processes (see DBConnector.insert_archive_data), so everything
+here must stay importable and picklable at module level.
+"""
+import re
+
+# Case-sensitive, counted in the original text
+CODE_INDICATORS = ['{', '}', 'function', 'class', 'def ', 'var ', 'const ', 'import ', 'return']
+
+# Counted in text.lower()
+PATTERNS = {
+    'Academic': ['et al', 'references', 'abstract', 'journal', 'university', 'research'],
+    'News': ['breaking', 'reported', 'according to', 'spokesperson', 'press release', 'journalist'],
+    'Forum': ['reply', 'quote', 'posted by', 'thread', 'username', 're:'],
+}
+
+# Same matches as r'\b(19|20)\d{2}\b': the lookbehind checks the character before "19"/"20"
+# once those two digits matched, so the pattern starts with a literal prefix instead of \b
+YEAR_RE = re.compile(r'(?:19|20)(?<!\w..)\d\d\b')
+# Each year (19xx, 20xx) counts twice towards Academic
+YEAR_WEIGHT = 2
+
+# Minimum score to classify (otherwise General)
+THRESHOLD = 5
+
+
+def category_scores(text):
+    """{'Code': n, 'Academic': n, 'News': n, 'Forum': n}"""
+    text_lower = text.lower()
+    scores = {'Code': sum(text.count(p) for p in CODE_INDICATORS)}
+    for category, patterns in PATTERNS.items():
+        scores[category] = sum(text_lower.count(p) for p in patterns)
+    scores['Academic'] += len(YEAR_RE.findall(text)) * YEAR_WEIGHT
+    return scores
+
+
+def detect_category(text):
+    """Deteksi kategori konten berdasarkan pola karakteristik"""
+    if not text:
+        return "General"
+
+    scores = category_scores(text)
+    # Ties go to the first of Code, Academic, News, Forum (max() keeps the first maximum)
+    max_category = max(scores, key=scores.get)
+    if scores[max_category] >= THRESHOLD:
+        return max_category
+    return "General"
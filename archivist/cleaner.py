@@ -0,0 +1,107 @@
+"""HTML -> cleaned_text extraction.
+
+Runs in worker processes (see ArchiveRetriever), so everything here must stay
+importable and picklable at module level.
+"""
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+# Tags whose content never ends up in cleaned_text
+UNWANTED_TAGS = ["script", "style", "nav", "footer", "header", "iframe"]
+_UNWANTED = frozenset(UNWANTED_TAGS)
+
+# Fastest first; "auto" picks the first one that is installed
+BACKEND_PRIORITY = ["selectolax", "lxml", "html.parser"]
+
+
+def _clean_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Remove unwanted tags
+    for tag in soup(UNWANTED_TAGS):
+        tag.decompose()
+
+    # Extract text
+    return soup.get_text(separator=' ', strip=True)
+
+
+def _clean_lxml(html):
+    if not html.strip():
+        return ""
+    try:
+        root = lxml.html.fromstring(html)
+    except (ValueError, etree.ParserError):
+        # e.g. str input with an XML encoding declaration
+        return _clean_bs4(html)
+    # Same rules as BeautifulSoup.get_text(separator=' ', strip=True):
+    # document order, comment text skipped (but not its tail), every string stripped.
+    # UNWANTED_TAGS subtrees are skipped, their tails kept as separate strings
+    # (drop_tree() would glue the tail onto the preceding text: "Hello<script/>World").
+    # Explicit stack instead of recursion so deeply nested pages are safe.
+    parts = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        if node.tag in _UNWANTED:
+            continue
+        if isinstance(node.tag, str) and node.text:
+            parts.append(node.text.strip())
+        for child in reversed(node):
+            if child.tail:
+                stack.append(child.tail.strip())
+            stack.append(child)
+    return ' '.join(p for p in parts if p)
+
+
+def _clean_selectolax(html):
+    tree = HTMLParser(html)
+    tree.strip_tags(UNWANTED_TAGS)
+    if tree.root is None:
+        return ""
+    parts = (node.text_content.strip() for node in tree.root.traverse(include_text=True)
+             if node.tag == "-text")
+    return ' '.join(p for p in parts if p)
+
+
+_BACKENDS = {
+    "html.parser": _clean_bs4,
+    "lxml": _clean_lxml,
+    "selectolax": _clean_selectolax,
+}
+
+
+def available_backends():
+    installed = {"html.parser": True, "lxml": lxml is not None, "selectolax": HTMLParser is not None}
+    return [name for name in BACKEND_PRIORITY if installed[name]]
+
+
+def resolve_backend(name=None):
+    """Maps a configured backend name to an installed one (falls back to html.parser)"""
+    name = (name or "html.parser").lower()
+    available = available_backends()
+    if name == "auto":
+        return available[0]
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown HTML backend: {name}")
+    if name not in available:
+        print(f"[Cleaner] Backend '{name}' tidak terinstall, fallback ke html.parser.")
+        return "html.parser"
+    return name
+
+
+def clean_html(html, backend="html.parser"):
+    """Strips UNWANTED_TAGS and returns the visible text joined by single spaces"""
+    return _BACKENDS[backend](html)
@@ -1,15 +1,110 @@
-import requests
+import threading
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from psycopg2.extras import execute_values
+from archivist.probe import LivenessProbe
+from archivist.sessions import get_session
+
+class HostThrottle:
+    """Jeda minimum antar request ke host yang sama (politeness per host)"""
+    def __init__(self, delay):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def wait(self, host):
+        with self._lock:
+            # Reserve the next free slot for this host, then sleep outside the lock
+            now = time.monotonic()
+            slot = max(now, self._hosts.get(host, now))
+            self._hosts[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
 
 class Collector:
-    def __init__(self, input_file, output_file):
+    # Checkpoint value per verdict (None = inconclusive, rechecked by the next run)
+    STATE_VALUES = {True: "DEAD", False: "ALIVE", None: "UNKNOWN"}
+
+    def __init__(self, input_file, output_file, concurrency=None, host_delay=None, state=None, session=None):
         self.input_file = input_file
         self.output_file = output_file
+        # Shared keep-alive session (archivist.sessions), also used by the Retriever
+        self.session = session or get_session()
+        # Optional PipelineState: verdicts from an interrupted run are reused with --resume
+        self.state = state
+        # Jumlah URL yang dicek bersamaan (COLLECTOR_CONCURRENCY=1 -> mode sekuensial)
+        self.concurrency = max(1, int(concurrency or os.environ.get("COLLECTOR_CONCURRENCY", 16)))
+        # Jeda antar request ke host yang sama, menggantikan time.sleep(1) global
+        if host_delay is None:
+            host_delay = float(os.environ.get("COLLECTOR_HOST_DELAY", 1.0))
+        self.throttle = HostThrottle(host_delay)
+        # Status reported_urls di-flush per batch: tiap N URL atau tiap N detik, mana yang duluan
+        self.db_batch_size = max(1, int(os.environ.get("COLLECTOR_DB_BATCH", 500)))
+        self.db_flush_seconds = float(os.environ.get("COLLECTOR_DB_FLUSH_SECONDS", 10))
+        # Cek bertingkat: HEAD dulu, lalu GET beberapa KB pertama (Range) hanya bila perlu
+        self.probe = LivenessProbe(
+            self.session, self.throttle,
+            timeout=float(os.environ.get("COLLECTOR_TIMEOUT", 5)),
+            range_bytes=int(os.environ.get("COLLECTOR_RANGE_BYTES", 4096)),
+            retries=int(os.environ.get("COLLECTOR_PROBE_RETRIES", 1)),
+            detect_soft404=os.environ.get("COLLECTOR_SOFT404", "1") != "0",
+            soft404_max_bytes=int(os.environ.get("COLLECTOR_SOFT404_MAX_BYTES", 16384)),
+            soft404_all=os.environ.get("COLLECTOR_SOFT404", "1").lower() == "all")
+
+    def _normalize(self, url):
+        if not url.startswith(('http://', 'https://')):
+            return 'http://' + url
+        return url
+
+    def check_url(self, url):
+        """Returns (is_dead, reason) for a single URL; is_dead is None if the check was inconclusive"""
+        try:
+            return self.probe.probe(self._normalize(url))
+        except Exception as e:
+            return True, f"Unknown Error ({e})"
+
+    def _flush_verdicts(self, conn, cur, verdicts):
+        """Applies a batch of (url, is_dead) to reported_urls in one transaction, then checkpoints it"""
+        if not verdicts:
+            return
+        dead = [url for url, is_dead in verdicts if is_dead]
+        alive = [url for url, is_dead in verdicts if is_dead is False]
+        unknown = [url for url, is_dead in verdicts if is_dead is None]
+
+        if conn and cur:
+            try:
+                if dead:
+                    # If dead, mark as CONFIRMED
+                    execute_values(cur, """
+                        UPDATE reported_urls r SET status='CONFIRMED_DEAD'
+                        FROM (VALUES %s) AS v(url)
+                        WHERE r.url = v.url
+                    """, [(url,) for url in dead], page_size=1000)
+                if alive:
+                    # If alive, remove from DB to save space
+                    cur.execute("DELETE FROM reported_urls WHERE url = ANY(%s)", (alive,))
+                if unknown:
+                    # Inconclusive (timeout/5xx): back to PENDING so the next run checks again
+                    cur.execute("UPDATE reported_urls SET status='PENDING' WHERE url = ANY(%s)", (unknown,))
+                conn.commit()
+                print(f"  [DB] {len(dead)} URL ditandai CONFIRMED_DEAD, {len(alive)} URL hidup dihapus dari database"
+                      f"{f', {len(unknown)} dicek ulang di run berikutnya' if unknown else ''}.")
+            except Exception as e:
+                print(f"  [DB Sync Error]: {e}")
+                try: conn.rollback()
+                except: pass
+                # Not checkpointed: --resume checks these URLs again and retries the write
+                return
+
+        # Checkpoint only after the DB batch, so --resume never skips an unsynced verdict
+        if self.state is not None:
+            self.state.mark_many("collect", [(url, self.STATE_VALUES[is_dead]) for url, is_dead in verdicts])
 
     def run(self):
         print(f"[Collector] Membaca {self.input_file}...")
-        
+
         try:
             with open(self.input_file, "r", encoding="utf-8") as f:
                 urls = [line.strip() for line in f if line.strip()]
@@ -20,71 +115,64 @@ class Collector:
             print(f"[Collector] Error membaca file input: {e}")
             return False
 
-        dead_urls = []
-        total_urls = len(urls)
-        print(f"[Collector] Ditemukan {total_urls} URL untuk divalidasi.\n")
+        # Duplicate lines are checked once but still written once per occurrence
+        unique_urls = list(dict.fromkeys(urls))
+
+        verdicts = {}
+        if self.state is not None:
+            state_verdicts = {value: is_dead for is_dead, value in self.STATE_VALUES.items()}
+            for url, status in self.state.get_all("collect").items():
+                verdicts[url] = state_verdicts.get(status)
+            remaining = [url for url in unique_urls if url not in verdicts]
+            if len(remaining) < len(unique_urls):
+                print(f"[Collector] Resume: {len(unique_urls) - len(remaining)} URL sudah dicek sebelumnya, dilewati.")
+            unique_urls = remaining
 
-        # Connect to DB for status updates
+        total_urls = len(unique_urls)
+        print(f"[Collector] Ditemukan {total_urls} URL untuk divalidasi (concurrency={self.concurrency}).\n")
+
+        # Connect to DB for status updates (pooled connection, returned at the end)
+        db_session = ExitStack()
         try:
             from db.connector import DBConnector
             db = DBConnector()
-            conn = db.get_connection()
+            conn = db_session.enter_context(db.connection())
             cur = conn.cursor() if conn else None
         except:
             conn = None
             cur = None
 
-        for index, url in enumerate(urls, 1):
-            target_url = url
-            if not target_url.startswith(('http://', 'https://')):
-                target_url = 'http://' + target_url
-
-            is_dead = False
-            reason = ""
+        pending = []
+        last_flush = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self.check_url, url): url for url in unique_urls}
 
-            print(f"[{index}/{total_urls}] Mengecek: {url} ...", end=" ", flush=True)
+            # DB updates stay on this thread; the connection is not shared with workers
+            for index, future in enumerate(as_completed(futures), 1):
+                url = futures[future]
+                is_dead, reason = future.result()
+                verdicts[url] = is_dead
 
-            try:
-                response = requests.head(target_url, timeout=5, allow_redirects=True)
-                if response.status_code == 404:
-                    is_dead = True
-                    reason = "404 Not Found"
+                if is_dead:
+                    print(f"[{index}/{total_urls}] {url} -> MATI ({reason})")
+                elif is_dead is None:
+                    print(f"[{index}/{total_urls}] {url} -> TIDAK PASTI ({reason})")
                 else:
-                    reason = f"Alive ({response.status_code})"
-            except requests.exceptions.Timeout:
-                is_dead = True
-                reason = "Timeout"
-            except requests.exceptions.RequestException as e:
-                is_dead = True
-                reason = f"Error ({type(e).__name__})"
-            except Exception as e:
-                is_dead = True
-                reason = f"Unknown Error ({e})"
-
-            if is_dead:
-                print(f"-> MATI ({reason})")
-                dead_urls.append(url)
-            else:
-                print(f"-> HIDUP ({reason})")
-
-            # DB Update Logic
-            if conn and cur:
-                try:
-                    if is_dead:
-                        # If dead, mark as CONFIRMED
-                        cur.execute("UPDATE reported_urls SET status='CONFIRMED_DEAD' WHERE url=%s", (url,))
-                    else:
-                        # If alive, remove from DB to save space
-                        cur.execute("DELETE FROM reported_urls WHERE url=%s", (url,))
-                        print(f"  [DB] URL hidup dihapus dari database.")
-                    conn.commit()
-                except Exception as e:
-                    print(f"  [DB Sync Error]: {e}")
-
-            time.sleep(1) # Faster rate limit for verification
-            
-        if conn:
-            conn.close()
+                    print(f"[{index}/{total_urls}] {url} -> HIDUP ({reason})")
+
+                # DB Update Logic: verdicts are applied in batches, not one commit per URL
+                pending.append((url, is_dead))
+                if len(pending) >= self.db_batch_size or time.monotonic() - last_flush >= self.db_flush_seconds:
+                    self._flush_verdicts(conn, cur, pending)
+                    pending = []
+                    last_flush = time.monotonic()
+
+        self._flush_verdicts(conn, cur, pending)
+        db_session.close()
+        self.probe.print_stats()
+
+        # Keep input order so dead_urls.txt matches the sequential output
+        dead_urls = [url for url in urls if verdicts.get(url)]
 
         print(f"\n[Collector] Menyimpan {len(dead_urls)} URL mati ke {self.output_file}...")
         try:
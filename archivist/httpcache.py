@@ -0,0 +1,111 @@
+"""Persistent on-disk cache for Wayback responses, kept in a small SQLite file.
+
+Snapshot pages (web.archive.org/web/<ts>/<url>) never change, so they are
+stored without expiry; CDX lookups get a max_age because new captures can
+appear. Only successful (200) responses are cached. The file is bounded by
+size: once it grows past max_bytes the least recently used entries go first.
+Bodies are zlib-compressed unless compress=False.
+"""
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    compressed INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+# Entries removed per DELETE when the cache is over max_bytes
+EVICT_BATCH = 64
+
+
+class CachedResponse:
+    """The part of requests.Response that ArchiveRetriever uses"""
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HTTPCache:
+    def __init__(self, path, max_bytes, compress=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        # Shared by the retriever's worker threads, so every access goes through _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._size = self._conn.execute("SELECT coalesce(sum(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url, max_age=None):
+        """Cached body text for url, or None (missing or older than max_age seconds)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT body, compressed, created_at FROM responses WHERE url=?",
+                                     (url,)).fetchone()
+            if row is not None and (max_age is None or now - row[2] <= max_age):
+                self._conn.execute("UPDATE responses SET last_access=? WHERE url=?", (now, url))
+                self.hits += 1
+            else:
+                row = None
+                self.misses += 1
+        if row is None:
+            return None
+        body, compressed, _ = row
+        return (zlib.decompress(body) if compressed else body).decode("utf-8", "surrogatepass")
+
+    def set(self, url, text):
+        data = text.encode("utf-8", "surrogatepass")
+        # Compress outside the lock; other threads keep reading meanwhile
+        body = zlib.compress(data, 6) if self.compress else data
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE url=?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, compressed, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, body, int(self.compress), len(body), now, now))
+            self._size += len(body) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Down to 90% so a full cache does not evict on every single insert
+        target = self.max_bytes * 0.9
+        # Oldest entries in batches, walked along idx_responses_last_access (rowid breaks ties, so
+        # both statements see the same rows); memory stays flat however large the cache is
+        oldest = "SELECT url FROM responses ORDER BY last_access, rowid LIMIT ?"
+        self._conn.execute("BEGIN")
+        try:
+            while self._size > target:
+                freed, count = self._conn.execute(
+                    f"SELECT coalesce(sum(size), 0), count(*) FROM responses WHERE url IN ({oldest})",
+                    (EVICT_BATCH,)).fetchone()
+                if not count:
+                    break
+                self._conn.execute(f"DELETE FROM responses WHERE url IN ({oldest})", (EVICT_BATCH,))
+                self._size -= freed
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            self._size = self._conn.execute("SELECT coalesce(sum(size), 0) FROM responses").fetchone()[0]
+            raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
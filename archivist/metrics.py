@@ -0,0 +1,194 @@
+"""Process-wide metrics: counters, gauges, histograms and stage timers.
+
+    from archivist import metrics
+
+    metrics.inc("retriever_snapshots_total", outcome="ok")
+    metrics.observe("http_request_seconds", 0.31, target="wayback")
+    with metrics.stage("retrieve"):
+        ...
+
+Histograms named *_seconds or *_bytes get latency or size buckets. to_dict()
+is what main.py writes into the JSON run report; render_prometheus() turns
+that (or a stored report) into the Prometheus text format served on /metrics.
+Keep label values low-cardinality (a tier, an outcome, "wayback"/"other"),
+never a URL.
+
+profile() wraps a block in cProfile or pyinstrument (PIPELINE_PROFILE).
+Both only see the calling thread; worker threads and processes show up as
+the time spent waiting on them.
+"""
+import bisect
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+
+
+def _buckets(name):
+    if name.endswith("_seconds"):
+        return TIME_BUCKETS
+    if name.endswith("_bytes"):
+        return BYTE_BUCKETS
+    return COUNT_BUCKETS
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> {"type": ..., "series": {labels: value or histogram}}
+        self._metrics = {}
+
+    def _series(self, name, kind, labels):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = {"type": kind, "series": {}}
+        elif metric["type"] != kind:
+            raise ValueError(f"metric {name} is a {metric['type']}, not a {kind}")
+        return metric["series"], tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            series, key = self._series(name, "counter", labels)
+            series[key] = series.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            series, key = self._series(name, "gauge", labels)
+            series[key] = value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            series, key = self._series(name, "histogram", labels)
+            hist = series.get(key)
+            if hist is None:
+                bounds = _buckets(name)
+                hist = series[key] = {"bounds": bounds, "counts": [0] * (len(bounds) + 1), "sum": 0.0, "count": 0}
+            hist["counts"][bisect.bisect_left(hist["bounds"], value)] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def stage(self, name):
+        """Wall time of a pipeline stage, as gauge stage_seconds{stage=name}"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.gauge("stage_seconds", round(time.perf_counter() - started, 3), stage=name)
+
+    def to_dict(self):
+        """JSON-serialisable snapshot; histogram buckets are cumulative, as in Prometheus"""
+        with self._lock:
+            out = {}
+            for name, metric in sorted(self._metrics.items()):
+                series = []
+                for key, value in metric["series"].items():
+                    entry = {"labels": dict(key)}
+                    if metric["type"] == "histogram":
+                        cumulative, running = {}, 0
+                        for bound, count in zip(list(value["bounds"]) + ["+Inf"], value["counts"]):
+                            running += count
+                            cumulative[str(bound)] = running
+                        entry.update(buckets=cumulative, sum=round(value["sum"], 6), count=value["count"])
+                    else:
+                        entry["value"] = value
+                    series.append(entry)
+                out[name] = {"type": metric["type"], "series": series}
+            return out
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+def _labels(labels, extra=None):
+    items = list(labels.items()) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def render_prometheus(data, prefix="nexus_"):
+    """Prometheus text exposition format for a to_dict() snapshot"""
+    lines = []
+    for name, metric in data.items():
+        full = prefix + name
+        lines.append(f"# TYPE {full} {metric['type']}")
+        for entry in metric["series"]:
+            labels = entry["labels"]
+            if metric["type"] == "histogram":
+                for bound, count in entry["buckets"].items():
+                    lines.append(f"{full}_bucket{_labels(labels, ('le', bound))} {count}")
+                lines.append(f"{full}_sum{_labels(labels)} {entry['sum']}")
+                lines.append(f"{full}_count{_labels(labels)} {entry['count']}")
+            else:
+                lines.append(f"{full}{_labels(labels)} {entry['value']}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def profile(mode, out_dir):
+    """Profiles the block with mode "cprofile" or "pyinstrument" (anything else: no profiling).
+
+    cProfile writes <out_dir>/profile.pstats and prints the top functions;
+    pyinstrument (optional package) writes <out_dir>/profile.html.
+    """
+    mode = (mode or "").lower()
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[Profile] pyinstrument tidak terinstall, pakai cProfile.")
+            mode = "cprofile"
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                path = os.path.join(out_dir, "profile.html")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+                print(f"[Profile] Disimpan ke {path}")
+            return
+    if mode != "cprofile":
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = os.path.join(out_dir, "profile.pstats")
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(20)
+        print(summary.getvalue())
+        print(f"[Profile] Disimpan ke {path} (buka dengan: python -m pstats {path})")
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+gauge = REGISTRY.gauge
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+stage = REGISTRY.stage
@@ -0,0 +1,248 @@
+"""Tiered liveness probe used by the Collector.
+
+Tier 1 is a HEAD request: 404/410 is dead, a 2xx that is not HTML is alive,
+and nothing is downloaded. Only what HEAD cannot settle goes to tier 2, a GET
+with Range: bytes=0-4095 that is streamed and abandoned after range_bytes:
+servers that reject HEAD (405, 501, ...), 5xx answers, and HTML pages that
+look like soft-404 candidates (redirected, on a parking host, or with a
+small or missing Content-Length). A normal-sized live HTML page is settled
+by HEAD alone; soft404_all=True checks every HTML page at the cost of a
+second request per URL. The soft-404 check looks at the <title> and the
+start of the body text with the indicators of detectDeadPage in
+extension/background.js, plus redirects from a deep link to the homepage.
+
+Timeouts, dropped connections and 429/5xx are retried; if they persist the
+verdict is None (inconclusive) instead of dead. DNS failures and refused
+connections are retried too, but still count as dead.
+"""
+import html
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from archivist import metrics
+
+DEAD_STATUSES = {404: "404 Not Found", 410: "410 Gone"}
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+# detectDeadPage indicators; the looser ones ('404', 'not found') only count in the title
+TITLE_INDICATORS = ("404", "not found", "page not found", "tidak ditemukan", "halaman tidak ditemukan",
+                    "error 404", "page doesn't exist", "content not available")
+BODY_INDICATORS = ("page not found", "halaman tidak ditemukan", "error 404", "404 not found",
+                   "page doesn't exist", "content not available")
+
+# Domain parking / for-sale landing pages that dead domains end up on
+PARKING_HOSTS = ("sedoparking.com", "sedo.com", "parkingcrew.net", "bodis.com", "above.com", "dan.com",
+                 "afternic.com", "hugedomains.com", "parklogic.com", "domainmarket.com")
+
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+SCRIPT_RE = re.compile(r"<(script|style)[^>]*>.*?(</\1>|$)", re.I | re.S)
+TAG_RE = re.compile(r"<[^>]*>?")
+
+# Errors that mean the host itself is gone rather than slow
+UNREACHABLE_MARKERS = ("NameResolutionError", "Name or service not known", "getaddrinfo failed",
+                       "nodename nor servname", "No address associated", "Connection refused")
+
+
+def soft_404(body):
+    """Indicator found in the first bytes of an HTML page ("title: ..."/"body: ..."), or None"""
+    match = TITLE_RE.search(body)
+    title = html.unescape(match.group(1)).strip().lower() if match else ""
+    for indicator in TITLE_INDICATORS:
+        if indicator in title:
+            return f"title: {indicator}"
+    text = html.unescape(TAG_RE.sub(" ", SCRIPT_RE.sub(" ", body))).lower()
+    for indicator in BODY_INDICATORS:
+        if indicator in text:
+            return f"body: {indicator}"
+    return None
+
+
+def _is_html(response):
+    content_type = response.headers.get("Content-Type", "").lower()
+    return not content_type or "html" in content_type
+
+
+def _redirected_home(url, response):
+    """A deep link that redirects to the site root is a classic soft-404"""
+    if not response.history:
+        return False
+    return urlsplit(url).path not in ("", "/") and urlsplit(response.url).path in ("", "/")
+
+
+def _parking_host(response):
+    host = (urlsplit(response.url).hostname or "").lower()
+    return any(host == parking or host.endswith("." + parking) for parking in PARKING_HOSTS)
+
+
+def _unreachable(e):
+    if isinstance(e, requests.exceptions.SSLError):
+        return False
+    text = repr(e)
+    return any(marker in text for marker in UNREACHABLE_MARKERS)
+
+
+class ProbeStats:
+    """Requests, time and bytes per tier, and how the verdicts came out"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tiers = {}
+        self.verdicts = {"dead": 0, "alive": 0, "unknown": 0, "soft404": 0}
+
+    def record(self, tier, seconds, nbytes, error=False):
+        with self._lock:
+            stats = self.tiers.setdefault(tier, {"requests": 0, "errors": 0, "seconds": 0.0, "bytes": 0})
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["seconds"] += seconds
+            stats["bytes"] += nbytes
+        metrics.observe("probe_seconds", seconds, tier=tier)
+        if nbytes:
+            metrics.observe("probe_read_bytes", nbytes, tier=tier)
+
+    def verdict(self, is_dead, reason):
+        verdict = "unknown" if is_dead is None else "dead" if is_dead else "alive"
+        soft = reason.startswith("Soft 404")
+        with self._lock:
+            self.verdicts[verdict] += 1
+            if soft:
+                self.verdicts["soft404"] += 1
+        metrics.inc("probe_verdicts_total", verdict="soft404" if soft else verdict)
+
+    def snapshot(self):
+        with self._lock:
+            tiers = {tier: dict(stats) for tier, stats in self.tiers.items()}
+            verdicts = dict(self.verdicts)
+        for stats in tiers.values():
+            stats["avg_ms"] = round(stats["seconds"] / stats["requests"] * 1000, 1) if stats["requests"] else 0.0
+            stats["seconds"] = round(stats["seconds"], 3)
+        return {"tiers": tiers, "verdicts": verdicts}
+
+
+class LivenessProbe:
+    def __init__(self, session, throttle=None, timeout=5.0, range_bytes=4096, retries=1, backoff=2.0,
+                 detect_soft404=True, soft404_max_bytes=16384, soft404_all=False):
+        self.session = session
+        self.throttle = throttle
+        self.timeout = timeout
+        self.range_bytes = max(1, range_bytes)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.detect_soft404 = detect_soft404
+        self.soft404_max_bytes = soft404_max_bytes
+        self.soft404_all = soft404_all
+        self.stats = ProbeStats()
+
+    def _request(self, tier, url):
+        if self.throttle is not None:
+            self.throttle.wait(urlsplit(url).netloc.lower())
+        started = time.perf_counter()
+        body = b""
+        try:
+            if tier == "head":
+                response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+            else:
+                with self.session.get(url, timeout=self.timeout, allow_redirects=True, stream=True,
+                                      headers={"Range": f"bytes=0-{self.range_bytes - 1}"}) as response:
+                    # Servers that ignore Range send the whole page; stop reading after range_bytes
+                    if response.ok and self.detect_soft404 and _is_html(response):
+                        body = self._read_prefix(response)
+        except requests.exceptions.RequestException:
+            self.stats.record(tier, time.perf_counter() - started, 0, error=True)
+            raise
+        self.stats.record(tier, time.perf_counter() - started, len(body))
+        return response, body
+
+    def _read_prefix(self, response):
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.range_bytes:
+                break
+        return b"".join(chunks)[:self.range_bytes]
+
+    def _soft404_candidate(self, head):
+        """Whether an OK HTML answer to HEAD is worth a ranged GET for the soft-404 check"""
+        if self.soft404_all or head.history or _parking_host(head):
+            return True
+        # Error pages are small; dynamic pages without a length cannot be judged from HEAD
+        length = head.headers.get("Content-Length", "")
+        return not length.isdigit() or int(length) <= self.soft404_max_bytes
+
+    def _error(self, e):
+        """(is_dead, reason, retry) for a failed request"""
+        if isinstance(e, requests.exceptions.Timeout):
+            return None, "Timeout", True
+        if _unreachable(e):
+            return True, f"Error ({type(e).__name__})", True
+        if isinstance(e, requests.exceptions.ConnectionError) and not isinstance(e, requests.exceptions.SSLError):
+            # Reset / dropped connection: the server is there but did not answer this time
+            return None, f"Error ({type(e).__name__})", True
+        return True, f"Error ({type(e).__name__})", False
+
+    def _probe_once(self, url):
+        # Tier 1: HEAD, no body
+        try:
+            head, _ = self._request("head", url)
+        except requests.exceptions.RequestException as e:
+            if isinstance(e, requests.exceptions.Timeout) or _unreachable(e):
+                return self._error(e)
+            # Some servers drop HEAD requests outright; GET decides
+            head = None
+
+        if head is not None:
+            code = head.status_code
+            if code in DEAD_STATUSES:
+                return True, DEAD_STATUSES[code], False
+            if head.ok:
+                if _redirected_home(url, head):
+                    return True, "Soft 404 (redirect ke homepage)", False
+                if not (self.detect_soft404 and _is_html(head) and self._soft404_candidate(head)):
+                    return False, f"Alive ({code})", False
+            elif code < 400 or code in (401, 407, 451):
+                # Exists but needs auth / is blocked for us: as before, not dead
+                return False, f"Alive ({code})", False
+
+        # Tier 2: first range_bytes of the page (HEAD rejected, 5xx, or a soft-404 candidate)
+        try:
+            response, body = self._request("range_get", url)
+        except requests.exceptions.RequestException as e:
+            return self._error(e)
+
+        code = response.status_code
+        if code in DEAD_STATUSES:
+            return True, DEAD_STATUSES[code], False
+        if code in TRANSIENT_STATUSES:
+            return None, f"Server Error ({code})", True
+        if response.ok:
+            if _redirected_home(url, response):
+                return True, "Soft 404 (redirect ke homepage)", False
+            indicator = soft_404(body.decode(response.encoding or "utf-8", "replace")) if body else None
+            if indicator:
+                return True, f"Soft 404 ({indicator})", False
+        # 416 = empty resource, 403 etc. = exists but refuses us
+        return False, f"Alive ({code})", False
+
+    def probe(self, url):
+        """Returns (is_dead, reason); is_dead is None when the check was inconclusive"""
+        for attempt in range(self.retries + 1):
+            is_dead, reason, retry = self._probe_once(url)
+            if not retry or attempt == self.retries:
+                break
+            time.sleep(self.backoff * (attempt + 1))
+        self.stats.verdict(is_dead, reason)
+        return is_dead, reason
+
+    def print_stats(self):
+        snapshot = self.stats.snapshot()
+        for tier, s in snapshot["tiers"].items():
+            print(f"  [Probe] {tier}: {s['requests']} request ({s['errors']} error), "
+                  f"rata-rata {s['avg_ms']:.0f} ms, {s['bytes'] / 1024:.1f} KB dibaca")
+        v = snapshot["verdicts"]
+        print(f"  [Probe] {v['dead']} mati ({v['soft404']} soft-404), {v['alive']} hidup, "
+              f"{v['unknown']} tidak pasti")
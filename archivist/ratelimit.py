@@ -0,0 +1,136 @@
+"""Adaptive per-host rate limiting and retries for archive.org requests.
+
+AdaptiveRateLimiter is a token bucket whose refill rate follows AIMD: every
+successful, fast response adds a little to the rate, a 429/5xx or a slow
+response halves it. A Retry-After header pauses the whole host.
+request_with_retries() retries throttled/failed requests with jittered
+exponential backoff ("full jitter"), honouring Retry-After when present.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from archivist import metrics
+
+# Worth another try: throttled or temporarily unavailable
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Server asks us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, rate, min_rate, max_rate, burst=1, increase=0.5, decrease=0.5, slow_latency=5.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1.0, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self._lock = threading.Lock()
+        # Theoretical arrival time of the next request (token bucket as virtual scheduling / GCRA)
+        self._tat = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+    def acquire(self):
+        """Blocks until a request may be sent"""
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now, self._paused_until)
+            # Up to `burst` requests may go out back to back after an idle period
+            slot = max(now, self._paused_until, tat - (self.burst - 1) / self.rate)
+            self._tat = tat + 1.0 / self.rate
+        # Reserve the slot under the lock, sleep outside it (like HostThrottle)
+        if slot > now:
+            time.sleep(slot - now)
+
+    def record(self, status, latency):
+        """Adapts the rate to one response (status None = connection error/timeout)"""
+        with self._lock:
+            now = time.monotonic()
+            if status is None or status in THROTTLE_STATUSES or status >= 500 or latency > self.slow_latency:
+                # One decrease per round of in-flight requests, not one per failed thread
+                if now - self._last_decrease >= 1.0 / self.rate:
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self._last_decrease = now
+            else:
+                # +increase per second's worth of successful requests
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def pause(self, seconds):
+        """Retry-After: no request to this host before `seconds` from now"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """One AdaptiveRateLimiter per host, created on first use with the same settings"""
+    def __init__(self, **settings):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def get(self, host):
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = self._hosts[host] = AdaptiveRateLimiter(**self.settings)
+            return limiter
+
+    def rates(self):
+        with self._lock:
+            return {host: round(limiter.rate, 2) for host, limiter in self._hosts.items()}
+
+
+def retry_after(response, limit=300.0):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), capped at limit; None if absent"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(0.0, seconds), limit)
+
+
+def request_with_retries(send, limiter, retries=4, backoff=1.0, max_backoff=60.0, label=""):
+    """Calls send() -> requests.Response under limiter, retrying 429/5xx and connection errors.
+
+    Returns the last response (possibly still an error status); re-raises the last exception
+    when every attempt failed without a response.
+    """
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = send()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            limiter.record(None, time.monotonic() - started)
+            if attempt == retries:
+                raise
+            response = None
+        else:
+            limiter.record(response.status_code, time.monotonic() - started)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+
+        status = response.status_code if response is not None else "connection error"
+        metrics.inc("http_retries_total", status=str(response.status_code) if response is not None else "error")
+        delay = retry_after(response)
+        if delay is not None:
+            # The next acquire() waits it out, for every worker talking to this host
+            limiter.pause(delay)
+            print(f"    [Retry] {label} -> {status}, Retry-After {delay:.1f}s ({attempt + 1}/{retries})")
+        else:
+            # Full jitter: concurrent workers that failed together do not retry together
+            delay = random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+            print(f"    [Retry] {label} -> {status}, coba lagi dalam {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
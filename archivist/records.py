@@ -0,0 +1,79 @@
+"""Append-only JSONL handoff between ArchiveRetriever and DBConnector.
+
+One JSON object per line: {"original_url", "archive_timestamp", "cleaned_text"}.
+Files ending in .gz are gzip-compressed. Legacy archive_data.json files
+(one big JSON array) can still be read.
+"""
+import gzip
+import json
+import threading
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class RecordWriter:
+    """Thread-safe writer; every record is flushed so a crash keeps what was already written"""
+    def __init__(self, path, append=False):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = _open(path, "a" if append else "w")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_records(path):
+    """Yields records one at a time; a truncated last line (crash mid-write) is skipped"""
+    with _open(path, "r") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == "[":
+            # Legacy format: a single JSON array, has to be loaded whole
+            yield from json.loads(first + f.read())
+            return
+
+        pending = first
+        try:
+            for line in f:
+                line = pending + line
+                pending = ""
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"[Records] Baris rusak dilewati di {path}: {line[:80]!r}")
+        except EOFError:
+            # gzip stream cut off by a crash; everything before it is still valid
+            print(f"[Records] {path} terpotong, membaca sampai record terakhir yang utuh.")
+
+
+def iter_batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
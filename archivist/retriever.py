@@ -1,13 +1,250 @@
-import requests
-import json
-import time
+import hashlib
+import queue
+import threading
 import os
-from bs4 import BeautifulSoup
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from archivist import metrics
+from archivist.cleaner import clean_html, resolve_backend
+from archivist.httpcache import CachedResponse
+from archivist.ratelimit import HostRateLimiter, request_with_retries
+from archivist.records import RecordWriter
+from archivist.sessions import get_session
+
+# Sentinel that tells a stage worker there is no more input
+_DONE = object()
+
+class SnapshotSequence:
+    """Cleaned snapshots of one URL, handed to emit() in CDX (timestamp) order whatever order they finish in.
+
+    Identical captures of a URL are deduplicated on the first record seen (on_cleaned, DBConnector),
+    so the earliest capture has to come first, as it did in the sequential retriever.
+    """
+    def __init__(self, emit):
+        self.emit = emit
+        self._next = 0
+        self._ready = {}
+        self._lock = threading.Lock()
+
+    def done(self, index, *result):
+        # Emitting under the lock keeps two finishing threads from writing out of order
+        with self._lock:
+            self._ready[index] = result
+            while self._next in self._ready:
+                self.emit(*self._ready.pop(self._next))
+                self._next += 1
+
+def _timed_clean(html, backend):
+    """clean_html in a pool process; the duration travels back with the result"""
+    started = time.perf_counter()
+    return clean_html(html, backend), time.perf_counter() - started
 
 class ArchiveRetriever:
-    def __init__(self, input_file, output_file):
+    def __init__(self, input_file, output_file, cdx_workers=None, fetch_workers=None, rate_limiter=None,
+                 clean_workers=None, html_backend=None, state=None, http_cache=None, session=None):
         self.input_file = input_file
         self.output_file = output_file
+        # Shared keep-alive session: CDX lookups and snapshot downloads reuse open connections
+        self.session = session or get_session()
+        # Optional PipelineState: finished CDX lookups and snapshots are skipped with --resume
+        self.state = state
+        # Ukuran pool tiap stage: CDX lookup dan download snapshot
+        self.cdx_workers = max(1, int(cdx_workers or os.environ.get("RETRIEVER_CDX_WORKERS", 4)))
+        self.fetch_workers = max(1, int(fetch_workers or os.environ.get("RETRIEVER_FETCH_WORKERS", 8)))
+        # Rate per host (web.archive.org) yang menyesuaikan diri: naik saat respons cepat,
+        # turun setengah saat 429/5xx/lambat; request yang gagal dicoba ulang dengan backoff
+        self.rate_limiter = rate_limiter or HostRateLimiter(
+            rate=float(os.environ.get("RETRIEVER_RATE", 4.0)),
+            min_rate=float(os.environ.get("RETRIEVER_MIN_RATE", 0.2)),
+            max_rate=float(os.environ.get("RETRIEVER_MAX_RATE", 20.0)),
+            burst=float(os.environ.get("RETRIEVER_BURST", 4)),
+            slow_latency=float(os.environ.get("RETRIEVER_SLOW_LATENCY", 15.0)))
+        self.retries = max(0, int(os.environ.get("RETRIEVER_RETRIES", 4)))
+        self.backoff = float(os.environ.get("RETRIEVER_BACKOFF", 1.0))
+        # Stage 3: HTML cleaning di process pool (0 = inline di thread download)
+        if clean_workers is None:
+            clean_workers = int(os.environ.get("RETRIEVER_CLEAN_WORKERS", os.cpu_count() or 1))
+        self.clean_workers = max(0, clean_workers)
+        # html.parser (default, sama seperti sebelumnya), lxml, selectolax, atau auto
+        self.html_backend = resolve_backend(html_backend or os.environ.get("RETRIEVER_HTML_BACKEND"))
+        # Optional HTTPCache: snapshots are stored forever, CDX answers for RETRIEVER_CDX_CACHE_TTL seconds
+        self.http_cache = http_cache
+        self.cdx_cache_ttl = float(os.environ.get("RETRIEVER_CDX_CACHE_TTL", 7 * 24 * 3600))
+        # (url, ts) already in archived_documents are not downloaded again (RETRIEVER_SKIP_STORED=0 to refetch)
+        self.skip_stored = os.environ.get("RETRIEVER_SKIP_STORED", "1") != "0"
+        self.stored = set()
+
+    def _get(self, url, timeout, max_age=None):
+        if self.http_cache is not None:
+            try:
+                text = self.http_cache.get(url, max_age)
+                metrics.inc("retriever_cache_total", result="miss" if text is None else "hit")
+                if text is not None:
+                    return CachedResponse(text)
+            except Exception as e:
+                print(f"  [Cache] {url} -> read error: {e}")
+
+        response = request_with_retries(lambda: self.session.get(url, timeout=timeout),
+                                        self.rate_limiter.get(url.split("/")[2]),
+                                        retries=self.retries, backoff=self.backoff, label=url)
+
+        if self.http_cache is not None and response.status_code == 200:
+            try:
+                self.http_cache.set(url, response.text)
+            except Exception as e:
+                print(f"  [Cache] {url} -> write error: {e}")
+        return response
+
+    def lookup_snapshots(self, url):
+        """Step 1: Check Availability (Get multiple snapshots via CDX).
+
+        Returns [(ts, snap_url), ...], or None if the lookup itself failed.
+        """
+        snapshots_found = []
+        try:
+            # Get up to 3 snapshots, collapsed by year (one per year)
+            cdx_url = f"http://web.archive.org/cdx/search/cdx?url={url}&output=json&limit=3&collapse=timestamp:4&filter=statuscode:200"
+            response = self._get(cdx_url, timeout=15, max_age=self.cdx_cache_ttl)
+
+            if response.status_code == 200:
+                data = response.json()
+                # format: [['urlkey', 'timestamp', 'original', 'mimetype', 'statuscode', 'digest', 'length'], ...]
+                if len(data) > 1: # data[0] is header
+                    digests = set()
+                    duplicates = 0
+                    for row in data[1:]:
+                        ts = row[1]
+                        # Same digest = byte-identical capture (e.g. an unchanged page in another year): download once
+                        digest = row[5] if len(row) > 5 else None
+                        if digest and digest in digests:
+                            duplicates += 1
+                            continue
+                        digests.add(digest)
+                        # Construct Wayback URL
+                        snap_url = f"https://web.archive.org/web/{ts}/{url}"
+                        snapshots_found.append((ts, snap_url))
+                    note = f" ({duplicates} duplikat digest dilewati)" if duplicates else ""
+                    print(f"  [CDX] {url} -> FOUND {len(snapshots_found)} snapshots{note}")
+                    metrics.inc("retriever_cdx_total", outcome="found")
+                    metrics.inc("retriever_snapshots_total", duplicates, outcome="duplicate_digest")
+                else:
+                    print(f"  [CDX] {url} -> NOT FOUND")
+                    metrics.inc("retriever_cdx_total", outcome="not_found")
+            else:
+                # Fallback to simple available API
+                api_url = f"https://archive.org/wayback/available?url={url}"
+                resp = self._get(api_url, timeout=10, max_age=self.cdx_cache_ttl)
+                d = resp.json()
+                if "archived_snapshots" in d and "closest" in d["archived_snapshots"]:
+                    closest = d["archived_snapshots"]["closest"]
+                    snapshots_found.append((closest["timestamp"], closest["url"]))
+                    print(f"  [CDX] {url} -> CDX Fail, FOUND (fallback)")
+                    metrics.inc("retriever_cdx_total", outcome="found_fallback")
+                else:
+                    print(f"  [CDX] {url} -> CDX Fail, NOT FOUND")
+                    metrics.inc("retriever_cdx_total", outcome="not_found")
+
+        except Exception as e:
+            print(f"  [CDX] {url} -> ERROR API: {e}")
+            metrics.inc("retriever_cdx_total", outcome="error")
+            return None
+
+        return snapshots_found
+
+    def download_snapshot(self, ts, snap_url):
+        """Step 2: Retrieve. Returns raw HTML or None"""
+        try:
+            content_response = self._get(snap_url, timeout=20)
+
+            if content_response.status_code == 200:
+                html = content_response.text
+                metrics.observe("retriever_snapshot_bytes", len(html.encode("utf-8", "surrogatepass")))
+                return html
+            print(f"    [{ts}] {snap_url} -> FAILED (Status {content_response.status_code})")
+        except Exception as e:
+            print(f"    [{ts}] {snap_url} -> ERROR: {e}")
+        metrics.inc("retriever_snapshots_total", outcome="failed")
+        return None
+
+    def _cdx_worker(self, url_queue, snapshot_queue, on_cleaned):
+        while True:
+            item = url_queue.get()
+            if item is _DONE:
+                return
+            if self.state is not None and self.state.get("cdx", item) == "DONE":
+                snapshots = self.state.pending_snapshots(item)
+            else:
+                snapshots = self.lookup_snapshots(item)
+                if snapshots is None:
+                    continue
+                if self.state is not None:
+                    self.state.add_snapshots(item, snapshots)
+
+            queued = []
+            for ts, snap_url in snapshots:
+                if (item, ts) in self.stored:
+                    print(f"    [{ts}] {snap_url} -> sudah ada di database, dilewati")
+                    metrics.inc("retriever_snapshots_total", outcome="stored")
+                    continue
+                if snap_url:
+                    queued.append((ts, snap_url))
+            sequence = SnapshotSequence(on_cleaned)
+            for index, (ts, snap_url) in enumerate(queued):
+                # Blocks when the download stage is behind (bounded queue)
+                snapshot_queue.put((item, ts, snap_url, sequence, index))
+
+    def _fetch_worker(self, snapshot_queue, clean_pool, clean_slots):
+        while True:
+            item = snapshot_queue.get()
+            if item is _DONE:
+                return
+            url, ts, snap_url, sequence, index = item
+            # Every snapshot reports back to its sequence, failed ones with None, so later ones are not held up
+            on_cleaned = partial(sequence.done, index, url, ts, snap_url)
+            html = self.download_snapshot(ts, snap_url)
+            if html is None:
+                on_cleaned(None)
+                continue
+
+            # Step 3: Clean
+            if clean_pool is None:
+                on_cleaned(self._clean(html, snap_url))
+                continue
+
+            # Hand the CPU-bound parsing to the process pool and go back to downloading.
+            # clean_slots bounds how many raw pages wait in memory for a free process.
+            clean_slots.acquire()
+            try:
+                future = clean_pool.submit(_timed_clean, html, self.html_backend)
+            except Exception as e:
+                # Broken pool (e.g. a worker was OOM-killed): keep going inline
+                clean_slots.release()
+                print(f"    [{ts}] {snap_url} -> process pool error ({e}), cleaning inline")
+                on_cleaned(self._clean(html, snap_url))
+                continue
+
+            def done(f, ts=ts, snap_url=snap_url, on_cleaned=on_cleaned):
+                clean_slots.release()
+                try:
+                    cleaned_text, seconds = f.result()
+                    metrics.observe("retriever_clean_seconds", seconds)
+                except Exception as e:
+                    print(f"    [{ts}] {snap_url} -> CLEAN ERROR: {e}")
+                    metrics.inc("retriever_snapshots_total", outcome="clean_error")
+                    cleaned_text = None
+                on_cleaned(cleaned_text)
+
+            future.add_done_callback(done)
+
+    def _clean(self, html, snap_url):
+        try:
+            with metrics.timer("retriever_clean_seconds"):
+                return clean_html(html, self.html_backend)
+        except Exception as e:
+            print(f"    {snap_url} -> CLEAN ERROR: {e}")
+            metrics.inc("retriever_snapshots_total", outcome="clean_error")
+            return None
 
     def run(self):
         print(f"[Retriever] Membaca {self.input_file}...")
@@ -22,100 +259,101 @@ class ArchiveRetriever:
             print(f"[Retriever] Error membaca input: {e}")
             return False
 
-        results = []
         total_urls = len(urls)
-        print(f"[Retriever] Ditemukan {total_urls} URL untuk diproses.\n")
-
-        for index, url in enumerate(urls, 1):
-            print(f"[{index}/{total_urls}] Processing: {url}")
-            
-            snapshot_url = None
-            timestamp = None
-            cleaned_text = ""
-            
-            # Step 1: Check Availability (Get multiple snapshots via CDX)
+        print(f"[Retriever] Ditemukan {total_urls} URL untuk diproses "
+              f"(cdx_workers={self.cdx_workers}, fetch_workers={self.fetch_workers}, "
+              f"clean_workers={self.clean_workers}, html_backend={self.html_backend}).")
+
+        if self.skip_stored and urls:
+            # One bulk query up front instead of re-downloading snapshots that are already indexed
+            from db.connector import DBConnector
+            self.stored = DBConnector().stored_snapshots(urls)
+            print(f"[Retriever] {len(self.stored)} snapshot sudah ada di database, tidak didownload ulang.")
+        print()
+
+        # Stage 1 (CDX lookup) -> snapshot_queue -> Stage 2 (download) -> Stage 3 (clean, process pool).
+        # Downloads for URL N overlap with CDX lookups for URL N+1.
+        url_queue = queue.Queue()
+        snapshot_queue = queue.Queue(maxsize=self.fetch_workers * 4)
+
+        # Records go to disk as soon as they are cleaned (JSONL, .gz = gzip),
+        # so memory stays flat and a crash keeps everything written so far.
+        try:
+            # A resumed run keeps the records written before the interruption
+            resumed = self.state is not None and self.state.resumed
+            writer = RecordWriter(self.output_file, append=resumed)
+        except Exception as e:
+            print(f"[Retriever] Gagal membuka output: {e}")
+            return False
+
+        # (url, hash of cleaned_text) already written; different captures often clean to the same text
+        written = set()
+        written_lock = threading.Lock()
+
+        def on_cleaned(url, ts, snap_url, cleaned_text):
+            if cleaned_text is None:
+                return
+            key = (url, hashlib.md5(cleaned_text.encode("utf-8", "surrogatepass")).hexdigest())
+            with written_lock:
+                duplicate = key in written
+                written.add(key)
+            if duplicate:
+                if self.state is not None:
+                    self.state.mark_snapshot(snap_url)
+                print(f"    [{ts}] {snap_url} -> DUPLIKAT (teks sama dengan snapshot lain), dilewati")
+                metrics.inc("retriever_snapshots_total", outcome="duplicate_text")
+                return
             try:
-                print(f"  -> Cukup ketersediaan (CDX)...", end=" ", flush=True)
-                # Get up to 3 snapshots, collapsed by year (one per year)
-                cdx_url = f"http://web.archive.org/cdx/search/cdx?url={url}&output=json&limit=3&collapse=timestamp:4&filter=statuscode:200"
-                response = requests.get(cdx_url, timeout=15)
-                
-                snapshots_found = []
-                if response.status_code == 200:
-                    data = response.json()
-                    # format: [['urlkey', 'timestamp', 'original', 'mimetype', 'statuscode', 'digest', 'length'], ...]
-                    if len(data) > 1: # data[0] is header
-                        for row in data[1:]:
-                            ts = row[1]
-                            # Construct Wayback URL
-                            snap_url = f"https://web.archive.org/web/{ts}/{url}"
-                            snapshots_found.append((ts, snap_url))
-                        
-                        print(f"FOUND {len(snapshots_found)} snapshots")
-                    else:
-                        print("NOT FOUND")
-                else:
-                    # Fallback to simple available API
-                    print("CDX Fail, fallback...", end=" ")
-                    api_url = f"https://archive.org/wayback/available?url={url}"
-                    resp = requests.get(api_url, timeout=10)
-                    d = resp.json()
-                    if "archived_snapshots" in d and "closest" in d["archived_snapshots"]:
-                         closest = d["archived_snapshots"]["closest"]
-                         snapshots_found.append((closest["timestamp"], closest["url"]))
-                         print("FOUND (fallback)")
-                    else:
-                         print("NOT FOUND")
+                writer.write({
+                    "original_url": url,
+                    "archive_timestamp": ts,
+                    "cleaned_text": cleaned_text
+                })
+                if self.state is not None:
+                    self.state.mark_snapshot(snap_url)
+                print(f"    [{ts}] {snap_url} -> OK")
+                metrics.inc("retriever_snapshots_total", outcome="ok")
+            except Exception as e:
+                print(f"    [{ts}] {snap_url} -> Gagal menyimpan output: {e}")
+                metrics.inc("retriever_snapshots_total", outcome="write_error")
 
+        clean_pool = None
+        if self.clean_workers:
+            try:
+                clean_pool = ProcessPoolExecutor(max_workers=self.clean_workers)
             except Exception as e:
-                print(f"ERROR API: {e}")
-                snapshots_found = []
+                print(f"[Retriever] Process pool tidak tersedia ({e}), cleaning inline.")
+        clean_slots = threading.BoundedSemaphore(max(1, self.clean_workers) * 4)
 
-            # Step 2 & 3: Retrieve and Clean (Loop through snapshots)
-            for ts, snap_url in snapshots_found:
-                if not snap_url: continue
-                
-                # Check for existing logic? No, let's just process.
-                # Skip variable defining since we loop now
-                pass 
+        for url in urls:
+            url_queue.put(url)
+        for _ in range(self.cdx_workers):
+            url_queue.put(_DONE)
 
+        # Each URL's snapshots are written in CDX order (SnapshotSequence); different URLs interleave
+        cdx_threads = [threading.Thread(target=self._cdx_worker, args=(url_queue, snapshot_queue, on_cleaned),
+                                        daemon=True)
+                       for _ in range(self.cdx_workers)]
+        fetch_threads = [threading.Thread(target=self._fetch_worker,
+                                          args=(snapshot_queue, clean_pool, clean_slots), daemon=True)
+                         for _ in range(self.fetch_workers)]
+        for t in cdx_threads + fetch_threads:
+            t.start()
 
-            # Step 2 & 3: Retrieve and Clean
-            for ts, snap_url in snapshots_found:
-                cleaned_text = ""
-                try:
-                    print(f"    -> [{ts}] Mengambil konten...", end=" ", flush=True)
-                    content_response = requests.get(snap_url, timeout=20)
-                    
-                    if content_response.status_code == 200:
-                        soup = BeautifulSoup(content_response.text, "html.parser")
-                        
-                        # Remove unwanted tags
-                        for tag in soup(["script", "style", "nav", "footer", "header", "iframe"]):
-                            tag.decompose()
-                            
-                        # Extract text
-                        cleaned_text = soup.get_text(separator=' ', strip=True)
-                        print("OK")
-                        
-                        results.append({
-                            "original_url": url,
-                            "archive_timestamp": ts,
-                            "cleaned_text": cleaned_text
-                        })
-                    else:
-                        print(f"FAILED (Status {content_response.status_code})")
-                except Exception as e:
-                    print(f"ERROR: {e}")
-            
-            time.sleep(2) # Connection cooldown
+        for t in cdx_threads:
+            t.join()
+        for _ in range(self.fetch_workers):
+            snapshot_queue.put(_DONE)
+        for t in fetch_threads:
+            t.join()
+        if clean_pool is not None:
+            # Waits for the pages still being cleaned
+            clean_pool.shutdown(wait=True)
 
-        print(f"\n[Retriever] Menyimpan {len(results)} data ke {self.output_file}...")
-        try:
-            with open(self.output_file, "w", encoding="utf-8") as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
-            print("[Retriever] Selesai.")
-            return True
-        except Exception as e:
-            print(f"[Retriever] Gagal menyimpan output: {e}")
-            return False
+        writer.close()
+        print(f"\n[Retriever] {writer.count} data tersimpan di {self.output_file}.")
+        if self.http_cache is not None:
+            print(f"[Retriever] HTTP cache: {self.http_cache.hits} hit, {self.http_cache.misses} miss.")
+        print(f"[Retriever] Rate akhir per host (req/s): {self.rate_limiter.rates()}")
+        print("[Retriever] Selesai.")
+        return True
@@ -0,0 +1,185 @@
+"""Shared HTTP session with keep-alive connection pools for the archivist pipeline.
+
+    from archivist.sessions import get_session
+
+    session = get_session()
+    response = session.get(url, timeout=10)
+    ...
+    session.print_metrics()
+
+One requests.Session per process, reused by the Collector and the Retriever,
+so requests to the same host go over an already open TCP/TLS connection
+instead of paying a new handshake each time. Sessions are shared between
+worker threads; urllib3's pools are thread-safe.
+
+Config: HTTP_POOL_HOSTS number of per-host pools kept open (64),
+HTTP_POOL_MAXSIZE idle connections kept per host (10), HTTP_POOL_HOST_SIZES
+overrides for busy hosts, e.g. "web.archive.org=16,archive.org=4" (the
+default, host[:port]); should be >= the number of workers talking to that host.
+"""
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from archivist import metrics
+
+DEFAULT_HOST_SIZES = "web.archive.org=16,archive.org=4"
+
+
+def target(host):
+    """Low-cardinality label for the registry: Wayback or some seed host"""
+    return "wayback" if host == "archive.org" or host.endswith(".archive.org") else "other"
+
+
+class HTTPMetrics:
+    """Per-host counters: requests and their duration, new connections and their handshake time"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host):
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = {"requests": 0, "errors": 0, "request_seconds": 0.0,
+                                         "connections": 0, "connect_seconds": 0.0}
+        return stats
+
+    def record_request(self, host, seconds, error=False):
+        with self._lock:
+            stats = self._host(host)
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["request_seconds"] += seconds
+
+    def record_connect(self, host, seconds):
+        with self._lock:
+            stats = self._host(host)
+            stats["connections"] += 1
+            stats["connect_seconds"] += seconds
+        metrics.observe("http_connect_seconds", seconds, target=target(host))
+
+    def snapshot(self):
+        """{host: stats} plus derived reuse ratio, averages and estimated handshake time saved"""
+        with self._lock:
+            hosts = {host: dict(stats) for host, stats in self._hosts.items()}
+        for stats in hosts.values():
+            requests_, connections = stats["requests"], stats["connections"]
+            avg_connect = stats["connect_seconds"] / connections if connections else 0.0
+            stats["reused"] = max(0, requests_ - connections)
+            stats["reuse_ratio"] = round(stats["reused"] / requests_, 3) if requests_ else 0.0
+            stats["avg_connect_ms"] = round(avg_connect * 1000, 1)
+            stats["avg_request_ms"] = round(stats["request_seconds"] / requests_ * 1000, 1) if requests_ else 0.0
+            # Every reused connection skipped one handshake of roughly the average cost
+            stats["saved_seconds"] = round(stats["reused"] * avg_connect, 2)
+            stats["request_seconds"] = round(stats["request_seconds"], 3)
+            stats["connect_seconds"] = round(stats["connect_seconds"], 3)
+        return hosts
+
+
+def _timed_pool(pool_cls, conn_cls, metrics):
+    """Connection pool class whose connections report their connect (TCP + TLS) time"""
+    class TimedConnection(conn_cls):
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            metrics.record_connect(self.host, time.perf_counter() - started)
+
+    return type("Timed" + pool_cls.__name__, (pool_cls,), {"ConnectionCls": TimedConnection})
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def __init__(self, metrics, **kwargs):
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _timed_pool(HTTPConnectionPool, HTTPConnection, self.metrics),
+            "https": _timed_pool(HTTPSConnectionPool, HTTPSConnection, self.metrics),
+        }
+
+
+def parse_host_sizes(value):
+    """"host=size,host=size" -> {host: size}"""
+    sizes = {}
+    for item in (value or "").split(","):
+        host, sep, size = item.strip().partition("=")
+        if sep and host.strip() and size.strip():
+            sizes[host.strip().lower()] = max(1, int(size))
+    return sizes
+
+
+class PooledSession(requests.Session):
+    def __init__(self, pool_hosts=None, pool_maxsize=None, host_sizes=None):
+        super().__init__()
+        self.pid = os.getpid()
+        self.metrics = HTTPMetrics()
+        self.pool_hosts = max(1, int(pool_hosts or os.environ.get("HTTP_POOL_HOSTS", 64)))
+        self.pool_maxsize = max(1, int(pool_maxsize or os.environ.get("HTTP_POOL_MAXSIZE", 10)))
+        if host_sizes is None:
+            host_sizes = parse_host_sizes(os.environ.get("HTTP_POOL_HOST_SIZES", DEFAULT_HOST_SIZES))
+        self.host_sizes = host_sizes
+
+        # Retries are handled by archivist.ratelimit, not by urllib3
+        default = TimedHTTPAdapter(self.metrics, pool_connections=self.pool_hosts,
+                                   pool_maxsize=self.pool_maxsize, max_retries=0)
+        self.mount("http://", default)
+        self.mount("https://", default)
+        # Longer prefixes win, so these hosts get their own, bigger pool
+        for host, size in host_sizes.items():
+            adapter = TimedHTTPAdapter(self.metrics, pool_connections=1, pool_maxsize=size, max_retries=0)
+            self.mount(f"http://{host}/", adapter)
+            self.mount(f"https://{host}/", adapter)
+
+    def send(self, request, **kwargs):
+        # Called once per redirect hop; with stream=False the body download is included
+        host = (urlsplit(request.url).hostname or "").lower()
+        started = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception as e:
+            self.metrics.record_request(host, time.perf_counter() - started, error=True)
+            metrics.inc("http_requests_total", target=target(host), status=type(e).__name__)
+            raise
+        elapsed = time.perf_counter() - started
+        self.metrics.record_request(host, elapsed)
+        metrics.observe("http_request_seconds", elapsed, target=target(host))
+        metrics.inc("http_requests_total", target=target(host), status=f"{response.status_code // 100}xx")
+        if not kwargs.get("stream"):
+            metrics.observe("http_response_bytes", len(response.content), target=target(host))
+        return response
+
+    def print_metrics(self, top=10):
+        hosts = self.metrics.snapshot()
+        if not hosts:
+            return
+        total_requests = sum(s["requests"] for s in hosts.values())
+        total_connections = sum(s["connections"] for s in hosts.values())
+        total_saved = sum(s["saved_seconds"] for s in hosts.values())
+        print(f"[HTTP] {total_requests} request, {total_connections} koneksi baru, "
+              f"~{total_saved:.1f}s handshake dihemat lewat keep-alive.")
+        busiest = sorted(hosts.items(), key=lambda item: item[1]["requests"], reverse=True)[:top]
+        for host, s in busiest:
+            print(f"  [HTTP] {host}: {s['requests']} request, {s['connections']} koneksi "
+                  f"({s['reuse_ratio']:.0%} reuse), handshake {s['avg_connect_ms']:.0f} ms, "
+                  f"request {s['avg_request_ms']:.0f} ms")
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """One session per process (a forked worker must not reuse the parent's sockets)"""
+    global _session
+    with _session_lock:
+        if _session is None or _session.pid != os.getpid():
+            _session = PooledSession()
+        return _session
@@ -0,0 +1,80 @@
+"""How cleaned_text is stored in archived_documents (ARCHIVE_TEXT_STORAGE).
+
+text        cleaned_text is the full extracted text (default).
+compressed  cleaned_text is the search body: whitespace runs collapsed and
+            cut at ARCHIVE_SEARCH_CHARS on a word boundary. The stored
+            tsvectors and ts_headline work on it, so huge pages no longer
+            cost their full size on every insert and search; content_hash
+            (dedup, change check) still covers the full text. When the body
+            drops anything, the full text is kept in
+            cleaned_text_full as a zstd frame (zlib when the optional
+            zstandard package is missing); full_text() reads either form.
+
+Runs in the process that inserts (DBConnector); everything here must stay
+importable at module level.
+"""
+import os
+import re
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MODES = ("text", "compressed")
+SEARCH_CHARS = 65536
+ZSTD_LEVEL = 10
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def storage_mode():
+    mode = os.environ.get("ARCHIVE_TEXT_STORAGE", "text").lower()
+    return mode if mode in MODES else "text"
+
+
+def search_body(text, max_chars=SEARCH_CHARS):
+    """Whitespace-normalized text, at most max_chars, not ending in the middle of a word"""
+    body = WHITESPACE_RE.sub(" ", text or "").strip()
+    if len(body) <= max_chars:
+        return body
+    cut = body.rfind(" ", max(0, max_chars - 100), max_chars + 1)
+    return body[:cut if cut > 0 else max_chars]
+
+
+def compress_text(text, level=ZSTD_LEVEL):
+    data = text.encode("utf-8", "surrogatepass")
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, 9)
+
+
+def decompress_text(blob):
+    data = bytes(blob)
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("cleaned_text_full is zstd-compressed; install zstandard to read it")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = zlib.decompress(data)
+    return data.decode("utf-8", "surrogatepass")
+
+
+def storage_form(text, mode=None, max_chars=None):
+    """(cleaned_text, cleaned_text_full) to write for a retriever record"""
+    text = text or ""
+    if (mode or storage_mode()) != "compressed":
+        return text, None
+    body = search_body(text, int(max_chars or os.environ.get("ARCHIVE_SEARCH_CHARS", SEARCH_CHARS)))
+    if body == text:
+        return body, None
+    return body, compress_text(text, int(os.environ.get("ARCHIVE_ZSTD_LEVEL", ZSTD_LEVEL)))
+
+
+def full_text(cleaned_text, cleaned_text_full):
+    """Full extracted text of a stored row, whichever mode wrote it"""
+    if cleaned_text_full is None:
+        return cleaned_text
+    return decompress_text(cleaned_text_full)
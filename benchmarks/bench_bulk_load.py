@@ -0,0 +1,103 @@
+"""Benchmark: rows/second of insert_archive_data (execute_values) vs bulk_load_archive_data (COPY).
+
+Writes N synthetic records to a temporary JSONL file, then loads them into an
+empty archived_documents once per mode. Needs DATABASE_URL; everything
+happens in schema "bench_bulk_load" (schema.sql + db/migrations), which is
+dropped afterwards (use --keep to inspect it).
+
+COPY saves the per-row statement and protocol overhead, not the server work
+both modes share: the two generated tsvector columns, their GIN indexes and
+the search_terms bookkeeping. On PostgreSQL 16 (1 CPU) it was 23% faster with
+20-word records and 2% faster with 400-word records, where that shared work
+is most of the time.
+
+Usage:
+    python -m benchmarks.bench_bulk_load --records 20000 --words 400
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from unittest import mock
+
+import psycopg2
+from psycopg2.extensions import make_dsn
+
+from archivist.records import RecordWriter
+from db.connector import DBConnector
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+SCHEMA = "bench_bulk_load"
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ("arsip web halaman hilang link rot knowledge forum thread reply journal research university "
+         "berita kode function return class according reported 1998 2004 tahun data").split()
+
+
+def write_records(path, records, words, rng):
+    with RecordWriter(path) as writer:
+        for i in range(records):
+            writer.write({
+                "original_url": f"https://example{i % 997}.com/page/{i}",
+                "archive_timestamp": f"{2000 + i % 20}0101000000",
+                "cleaned_text": " ".join(rng.choice(WORDS) for _ in range(words)),
+            })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=400, help="words per record")
+    parser.add_argument("--keep", action="store_true", help="do not drop the bench_bulk_load schema")
+    args = parser.parse_args()
+
+    dsn = os.environ.get("DATABASE_URL")
+    if not dsn:
+        raise SystemExit("DATABASE_URL not set.")
+
+    admin = psycopg2.connect(dsn)
+    admin.autocommit = True
+    cur = admin.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+
+    tmp = tempfile.TemporaryDirectory()
+    data_file = os.path.join(tmp.name, "archive_data.jsonl")
+    try:
+        db = DBConnector(make_dsn(dsn, options=f"-c search_path={SCHEMA}"))
+        db.init_db(os.path.join(BASE_DIR, "db", "schema.sql"))
+
+        print(f"Writing {args.records} records x {args.words} words...")
+        write_records(data_file, args.records, args.words, random.Random(42))
+        size_mb = os.path.getsize(data_file) / 1024 / 1024
+
+        results = []
+        for label, load in (("execute_values", db.insert_archive_data), ("COPY", db.bulk_load_archive_data)):
+            cur.execute(f"TRUNCATE {SCHEMA}.archived_documents, {SCHEMA}.search_terms")
+            start = time.perf_counter()
+            with mock.patch("builtins.print"):
+                ok = load(data_file)
+            elapsed = time.perf_counter() - start
+            cur.execute(f"SELECT count(*) FROM {SCHEMA}.archived_documents")
+            results.append((label, ok, cur.fetchone()[0], elapsed))
+
+        print(f"\n{args.records} records, {size_mb:.1f} MB JSONL\n")
+        print(f"{'mode':<16} {'rows':>8} {'seconds':>8} {'rows/s':>9} {'MB/s':>7}")
+        for label, ok, rows, elapsed in results:
+            note = "" if ok else "  (failed)"
+            print(f"{label:<16} {rows:>8} {elapsed:>8.2f} {rows / elapsed:>9.0f} {size_mb / elapsed:>7.1f}{note}")
+    finally:
+        tmp.cleanup()
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.close()
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
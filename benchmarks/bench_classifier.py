@@ -0,0 +1,124 @@
+"""Benchmark: category detection on multi-megabyte pages.
+
+Compares the original DBConnector._detect_category (kept below as
+`original_detect_category`) with archivist/classifier.py, serially and over
+a process pool, and checks that every page gets the same category.
+A third column shows a single alternation regex over all patterns. It gives
+the same scores, but in CPython it is slower than the C str.count() calls.
+
+Usage:
+    python -m benchmarks.bench_classifier --pages 8 --size-mb 4 --workers 4
+"""
+import argparse
+import random
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from archivist.classifier import CODE_INDICATORS, PATTERNS, detect_category
+
+PROSE = ("arsip web halaman hilang link rot forum thread reply journal research university berita "
+         "according to the reported tahun data posted by username breaking spokesperson").split()
+CODE = "function return class var const import def { } ( ) = ; x y i".split()
+YEARS = ["1998", "2004", "2019", "(2010)", "19999", "x2001"]
+
+
+def original_detect_category(text):
+    """DBConnector._detect_category before archivist/classifier.py"""
+    if not text:
+        return "General"
+    text_lower = text.lower()
+    code_indicators = ['{', '}', 'function', 'class', 'def ', 'var ', 'const ', 'import ', 'return']
+    code_score = sum(text.count(indicator) for indicator in code_indicators)
+    academic_patterns = ['et al', 'references', 'abstract', 'journal', 'university', 'research']
+    academic_score = sum(text_lower.count(pattern) for pattern in academic_patterns)
+    year_matches = re.findall(r'\b(19|20)\d{2}\b', text)
+    academic_score += len(year_matches) * 2
+    news_patterns = ['breaking', 'reported', 'according to', 'spokesperson', 'press release', 'journalist']
+    news_score = sum(text_lower.count(pattern) for pattern in news_patterns)
+    forum_patterns = ['reply', 'quote', 'posted by', 'thread', 'username', 're:']
+    forum_score = sum(text_lower.count(pattern) for pattern in forum_patterns)
+    scores = {'Code': code_score, 'Academic': academic_score, 'News': news_score, 'Forum': forum_score}
+    max_category = max(scores, key=scores.get)
+    if scores[max_category] >= 5:
+        return max_category
+    return "General"
+
+
+_CODE_RE = re.compile("|".join([r'\b(?:19|20)\d{2}\b'] + [re.escape(p) for p in CODE_INDICATORS]))
+_WORDS = sorted({p for group in PATTERNS.values() for p in group}, key=len, reverse=True)
+# Lookahead at every position: the word lists overlap ("journal" / "journalist")
+_WORDS_RE = re.compile("(?=(" + "|".join(re.escape(p) for p in _WORDS) + "))")
+_CATEGORY = {p: category for category, group in PATTERNS.items() for p in group}
+_ALSO_COUNTS = {p: [q for q in _WORDS if q != p and p.startswith(q)] for p in _WORDS}
+
+
+def regex_detect_category(text):
+    """Single alternation regex per case class (the approach rejected for archivist/classifier.py)"""
+    if not text:
+        return "General"
+    scores = {'Code': 0, 'Academic': 0, 'News': 0, 'Forum': 0}
+    for match, n in Counter(_CODE_RE.findall(text)).items():
+        if match[0].isdigit():
+            scores['Academic'] += n * 2
+        else:
+            scores['Code'] += n
+    for match, n in Counter(_WORDS_RE.findall(text.lower())).items():
+        for word in [match] + _ALSO_COUNTS[match]:
+            scores[_CATEGORY[word]] += n
+    max_category = max(scores, key=scores.get)
+    return max_category if scores[max_category] >= 5 else "General"
+
+
+def synthetic_page(rng, size, code_ratio):
+    words, length = [], 0
+    while length < size:
+        pool = CODE if rng.random() < code_ratio else PROSE
+        word = rng.choice(YEARS) if rng.random() < 0.01 else rng.choice(pool)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def timed(fn, pages):
+    start = time.perf_counter()
+    categories = fn(pages)
+    return time.perf_counter() - start, categories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    size = int(args.size_mb * 1024 * 1024)
+    pages = [synthetic_page(rng, size, code_ratio=i / max(1, args.pages - 1)) for i in range(args.pages)]
+    total_mb = sum(len(p) for p in pages) / 1024 / 1024
+
+    runs = [
+        ("original", lambda ps: [original_detect_category(p) for p in ps]),
+        ("one regex", lambda ps: [regex_detect_category(p) for p in ps]),
+        ("classifier", lambda ps: [detect_category(p) for p in ps]),
+    ]
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    if pool is not None:
+        list(pool.map(detect_category, ["warm up"] * args.workers))
+        runs.append((f"pool x{args.workers}", lambda ps: list(pool.map(detect_category, ps))))
+
+    print(f"{args.pages} pages, {total_mb:.1f} MB total\n")
+    print(f"{'mode':<14} {'seconds':>8} {'MB/s':>8} {'same':>6}")
+    baseline = None
+    for label, fn in runs:
+        elapsed, categories = timed(fn, pages)
+        baseline = baseline or categories
+        print(f"{label:<14} {elapsed:>8.2f} {total_mb / elapsed:>8.1f} {str(categories == baseline):>6}")
+    if pool is not None:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark: pages/second for each HTML cleaning backend.
+
+Usage:
+    python -m benchmarks.bench_cleaner                 # synthetic pages
+    python -m benchmarks.bench_cleaner page1.html ...  # your own saved snapshots
+    python -m benchmarks.bench_cleaner --workers 4     # also measure the process pool
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from archivist.cleaner import available_backends, clean_html
+
+WORDS = ("arsip web halaman hilang link rot knowledge forum thread reply journal "
+         "research university berita kode function return class").split()
+
+# Removed tags between two words without whitespace around them: every backend must keep the words apart
+INLINE_CASES = [
+    "<p>Hello<script>x</script>World</p>",
+    "<body>a<style>s</style>b<iframe>i</iframe>c</body>",
+    "<div>one<nav><a>menu</a></nav>two<footer>f</footer>three</div>",
+    "<p>x<!-- c -->y<b>z</b>w</p>",
+    "<html><body><header>h</header>only<script>1</script><script>2</script>text</body></html>",
+]
+
+
+def synthetic_page(rng, paragraphs):
+    body = []
+    for i in range(paragraphs):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+        body.append(f"<div class='post' id='p{i}'><h2>Post {i}</h2><p>{text} &amp; more<!-- c{i} --> "
+                    f"<a href='/x/{i}'>link</a> tail</p><script>var x{i} = {i};</script></div>")
+    return ("<!DOCTYPE html><html><head><title>Arsip</title><style>body{color:red}</style></head><body>"
+            "<header><nav><ul><li>Home</li><li>About</li></ul></nav></header>"
+            + "".join(body) +
+            "<iframe src='ads'></iframe><footer>Copyright</footer></body></html>")
+
+
+def bench(backend, pages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            clean_html(html, backend)
+    elapsed = time.perf_counter() - start
+    return len(pages) * rounds / elapsed
+
+
+def bench_pool(backend, pages, rounds, workers):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(clean_html, pages[:workers], [backend] * workers))  # warm up workers
+        start = time.perf_counter()
+        for _ in range(rounds):
+            list(pool.map(clean_html, pages, [backend] * len(pages), chunksize=1))
+        elapsed = time.perf_counter() - start
+    return len(pages) * rounds / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="HTML files to use instead of synthetic pages")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=400, help="size of each synthetic page")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=0, help="process pool size (0 = skip pool benchmark)")
+    args = parser.parse_args()
+
+    if args.files:
+        pages = []
+        for path in args.files:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    else:
+        rng = random.Random(42)
+        pages = [synthetic_page(rng, args.paragraphs) for _ in range(args.pages)]
+
+    avg_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, avg {avg_kb:.0f} KB, {args.rounds} rounds\n")
+
+    reference = [clean_html(p, "html.parser") for p in pages]
+    inline_reference = [clean_html(p, "html.parser") for p in INLINE_CASES]
+    for backend in available_backends():
+        for html, expected in zip(INLINE_CASES, inline_reference):
+            got = clean_html(html, backend)
+            if got != expected:
+                print(f"[parity] {backend}: {html!r} -> {got!r}, html.parser: {expected!r}")
+    baseline = None
+    print(f"{'backend':<12} {'pages/s':>10} {'speedup':>8} {'identical':>10}")
+    for backend in reversed(available_backends()):
+        identical = sum(clean_html(p, backend) == r for p, r in zip(pages, reference))
+        rate = bench(backend, pages, args.rounds)
+        baseline = baseline or rate
+        print(f"{backend:<12} {rate:>10.1f} {rate / baseline:>7.1f}x {identical:>5}/{len(pages)}")
+        if args.workers:
+            pool_rate = bench_pool(backend, pages, args.rounds, args.workers)
+            print(f"{'  pool x' + str(args.workers):<12} {pool_rate:>10.1f} {pool_rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
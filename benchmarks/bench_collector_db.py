@@ -0,0 +1,95 @@
+"""Benchmark: database round trips of Collector status updates.
+
+Runs Collector over N synthetic URLs with the network check stubbed out and
+a recording connection in place of PostgreSQL, once with one transaction
+per URL (COLLECTOR_DB_BATCH=1, the old behaviour) and once batched.
+Every execute() and commit() is one round trip to the server.
+
+Usage:
+    python -m benchmarks.bench_collector_db --urls 10000 --batch 500
+"""
+import argparse
+import os
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+from archivist.collector import Collector
+from db.connector import DBConnector
+
+
+class RecordingCursor:
+    def __init__(self, stats):
+        self.stats = stats
+        self.connection = mock.Mock(encoding="UTF8")
+
+    def mogrify(self, template, args):
+        # Only used by execute_values to build the VALUES list client-side
+        return b"('" + str(args[0]).encode() + b"')"
+
+    def execute(self, sql, params=None):
+        self.stats["execute"] += 1
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.stats = {"execute": 0, "commit": 0}
+
+    def cursor(self):
+        return RecordingCursor(self.stats)
+
+    def commit(self):
+        self.stats["commit"] += 1
+
+    def rollback(self):
+        pass
+
+
+def run(urls, batch, dead_ratio):
+    conn = RecordingConnection()
+
+    @contextmanager
+    def connection(self):
+        yield conn
+
+    every = max(1, round(1 / dead_ratio)) if dead_ratio else 0
+
+    def check_url(self, url):
+        dead = bool(every) and int(url.rsplit("/", 1)[1]) % every == 0
+        return dead, "stub"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed = os.path.join(tmp, "seed.txt")
+        with open(seed, "w", encoding="utf-8") as f:
+            f.write("\n".join(f"https://example{i % 97}.com/{i}" for i in range(urls)))
+
+        env = {"COLLECTOR_DB_BATCH": str(batch), "COLLECTOR_DB_FLUSH_SECONDS": "3600"}
+        with mock.patch.dict(os.environ, env), \
+             mock.patch.object(DBConnector, "connection", connection), \
+             mock.patch.object(Collector, "check_url", check_url), \
+             mock.patch("builtins.print"):
+            Collector(seed, os.path.join(tmp, "dead.txt"), host_delay=0).run()
+
+    return conn.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--dead-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{args.urls} URLs, {args.dead_ratio:.0%} dead\n")
+    print(f"{'mode':<16} {'execute':>8} {'commit':>8} {'round trips':>12} {'per URL':>8}")
+    for label, batch in (("per-URL", 1), (f"batch={args.batch}", args.batch)):
+        stats = run(args.urls, batch, args.dead_ratio)
+        trips = stats["execute"] + stats["commit"]
+        print(f"{label:<16} {stats['execute']:>8} {stats['commit']:>8} {trips:>12} {trips / args.urls:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Benchmark: /search with on-the-fly to_tsvector() vs stored tsvector columns.
+
+Builds a scratch schema with N synthetic documents, then runs
+EXPLAIN (ANALYZE, BUFFERS) for the old and the new search query, and for
+the rank-first query of web/search.py (ts_headline only on the final page).
+Needs DATABASE_URL; everything happens in schema "bench_search",
+which is dropped afterwards (use --keep to inspect it).
+
+Usage:
+    python -m benchmarks.bench_search --docs 100000
+"""
+import argparse
+import json
+import os
+import random
+
+import psycopg2
+
+from web.search import SEARCH_SQL
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+SCHEMA = "bench_search"
+
+REAL_WORDS = ("arsip sejarah internet forum kaskus berita pemerintah universitas jurnal penelitian "
+              "algoritma program komputer friendster geocities archive history government research "
+              "journal software computer network community website").split()
+
+OLD_QUERY = """
+    SELECT original_url,
+           ts_headline('indonesian', cleaned_text, plainto_tsquery('indonesian', %(q)s)),
+           ts_headline('english', cleaned_text, plainto_tsquery('english', %(q)s))
+    FROM docs
+    WHERE to_tsvector('indonesian', cleaned_text) @@ plainto_tsquery('indonesian', %(q)s)
+       OR to_tsvector('english', cleaned_text) @@ plainto_tsquery('english', %(q)s)
+    ORDER BY (ts_rank(to_tsvector('indonesian', cleaned_text), plainto_tsquery('indonesian', %(q)s)) +
+              ts_rank(to_tsvector('english', cleaned_text), plainto_tsquery('english', %(q)s))) DESC
+    LIMIT 20
+"""
+
+NEW_QUERY = """
+    SELECT original_url,
+           ts_headline('indonesian', cleaned_text, q_id),
+           ts_headline('english', cleaned_text, q_en)
+    FROM docs, plainto_tsquery('indonesian', %(q)s) q_id, plainto_tsquery('english', %(q)s) q_en
+    WHERE search_id @@ q_id OR search_en @@ q_en
+    ORDER BY (ts_rank(search_id, q_id) + ts_rank(search_en, q_en)) DESC
+    LIMIT 20
+"""
+
+DEFERRED_QUERY = SEARCH_SQL.format(after="TRUE", years="TRUE").replace("archived_documents", "docs")
+
+
+def vocabulary(size, rng):
+    letters = "abcdefghijklmnoprstuw"
+    words = set(REAL_WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return list(words)
+
+
+def populate(cur, docs, words_per_doc, vocab):
+    # power(random(), 3) skews picks towards the start of the list (few common, many rare words).
+    # "+ i * 0" ties the aggregate to the inner series; with only outer columns in its argument
+    # PostgreSQL would evaluate string_agg at the outer level. "g * 0" makes the subquery re-run per row.
+    cur.execute("""
+        INSERT INTO docs (original_url, cleaned_text)
+        SELECT 'https://example.com/' || g,
+               (SELECT string_agg(v.w[1 + floor(power(random(), 3) * array_length(v.w, 1))::int + i * 0], ' ')
+                FROM generate_series(1, %(words)s + g * 0) i)
+        FROM generate_series(1, %(docs)s) g, (SELECT %(vocab)s::text[] AS w) v
+    """, {"docs": docs, "words": words_per_doc, "vocab": vocab})
+
+
+def node_types(plan):
+    found = [plan["Node Type"]]
+    for child in plan.get("Plans", []):
+        found.extend(node_types(child))
+    return found
+
+
+def explain(cur, sql, q, offset=0):
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, {"q": q, "limit": 20, "offset": offset})
+    result = cur.fetchone()[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--words", type=int, default=300, help="words per document")
+    parser.add_argument("--vocab", type=int, default=20000)
+    parser.add_argument("--keep", action="store_true", help="do not drop the bench_search schema")
+    args = parser.parse_args()
+
+    dsn = os.environ.get("DATABASE_URL")
+    if not dsn:
+        raise SystemExit("DATABASE_URL not set.")
+
+    rng = random.Random(42)
+    vocab = vocabulary(args.vocab, rng)
+    queries = [vocab[0], vocab[len(vocab) // 50], vocab[-1], f"{vocab[1]} {vocab[200]}"]
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA}")
+        cur.execute("""
+            CREATE TABLE docs (
+                id SERIAL PRIMARY KEY,
+                original_url TEXT NOT NULL,
+                cleaned_text TEXT,
+                archive_timestamp TIMESTAMP,
+                category TEXT
+            )
+        """)
+        print(f"Populating {args.docs} documents x {args.words} words...")
+        populate(cur, args.docs, args.words, vocab)
+
+        # Before: what db/schema.sql used to create (indonesian expression index only)
+        cur.execute("CREATE INDEX ON docs USING GIN (to_tsvector('indonesian', cleaned_text))")
+        cur.execute("ANALYZE docs")
+        before = {q: explain(cur, OLD_QUERY, q) for q in queries}
+
+        # After: db/migrations/001_search_tsvector.sql
+        print("Adding stored tsvector columns + GIN indexes...")
+        cur.execute("""
+            ALTER TABLE docs
+                ADD COLUMN search_id tsvector
+                    GENERATED ALWAYS AS (to_tsvector('indonesian', coalesce(cleaned_text, ''))) STORED,
+                ADD COLUMN search_en tsvector
+                    GENERATED ALWAYS AS (to_tsvector('english', coalesce(cleaned_text, ''))) STORED
+        """)
+        cur.execute("CREATE INDEX ON docs USING GIN (search_id)")
+        cur.execute("CREATE INDEX ON docs USING GIN (search_en)")
+        cur.execute("ANALYZE docs")
+        after = {q: explain(cur, NEW_QUERY, q) for q in queries}
+        deferred = {q: explain(cur, DEFERRED_QUERY, q) for q in queries}
+        page5 = {q: explain(cur, DEFERRED_QUERY, q, offset=80) for q in queries}
+
+        print(f"\n{'query':<24} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan (after)")
+        for q in queries:
+            old_ms = before[q]["Execution Time"]
+            new_ms = after[q]["Execution Time"]
+            seq = "Seq Scan" in node_types(before[q]["Plan"])
+            plan = sorted(set(t for t in node_types(after[q]["Plan"]) if "Scan" in t))
+            print(f"{q[:24]:<24} {old_ms:>10.1f} {new_ms:>10.1f} {old_ms / new_ms:>7.1f}x  "
+                  f"{', '.join(plan)}{'  (before: Seq Scan)' if seq else ''}")
+
+        print(f"\n{'query':<24} {'2 headlines':>12} {'rank first':>11} {'page 5':>8}")
+        for q in queries:
+            print(f"{q[:24]:<24} {after[q]['Execution Time']:>12.1f} {deferred[q]['Execution Time']:>11.1f} "
+                  f"{page5[q]['Execution Time']:>8.1f}")
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Benchmark: storage size and /search latency per cleaned_text storage mode.
+
+Loads the same synthetic corpus (mostly page-sized documents plus a share of
+huge ones) through DBConnector.insert_archive_data three times:
+
+    text        full text in cleaned_text, default pglz TOAST compression
+    text_lz4    same, with cleaned_text SET COMPRESSION lz4 (PostgreSQL 14+)
+    compressed  ARCHIVE_TEXT_STORAGE=compressed: bounded search body in
+                cleaned_text, full text as zstd/zlib in cleaned_text_full
+
+and reports table (heap + TOAST) and index size, a gzip'ed COPY of the
+stored columns (what the pg_dump | gzip backup grows with), load time, and
+the median / p95 latency of web/search.py search_documents() per query.
+Huge documents end in a code listing past ARCHIVE_SEARCH_CHARS, and every
+mode must store the same categories as "text" (classified on the full text,
+not the search body).
+Needs DATABASE_URL; everything happens in schema "bench_text_storage",
+which is dropped afterwards (use --keep to inspect it).
+
+Usage:
+    python -m benchmarks.bench_text_storage --docs 2000 --huge 0.05
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import zlib
+from unittest import mock
+
+import psycopg2
+from psycopg2.extensions import make_dsn
+
+from archivist import textstore
+from archivist.records import RecordWriter
+from db.connector import DBConnector
+from web.search import search_documents
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+SCHEMA = "bench_text_storage"
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REAL_WORDS = ("arsip sejarah internet forum kaskus berita pemerintah universitas jurnal penelitian "
+              "algoritma program komputer friendster geocities archive history government research "
+              "journal software computer network community website").split()
+
+MODES = (("text", "text", "pglz"), ("text_lz4", "text", "lz4"), ("compressed", "compressed", "pglz"))
+
+# Appended to huge documents: Code indicators only the full text contains
+CODE_TAIL = " ".join(["def main(): return {x}; import os; const y = function() {}"] * 200)
+
+# Stored (non-generated) columns, as pg_dump writes them
+DUMP_SQL = ("COPY (SELECT id, original_url, archive_timestamp, cleaned_text, cleaned_text_full, content_hash, category, created_at "
+            "FROM archived_documents) TO STDOUT")
+
+
+def vocabulary(size, rng):
+    letters = "abcdefghijklmnoprstuw"
+    words = set(REAL_WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+
+def write_records(path, docs, words, huge, huge_words, vocab, rng):
+    with RecordWriter(path) as writer:
+        for i in range(docs):
+            is_huge = rng.random() < huge
+            n = huge_words if is_huge else rng.randint(words // 2, words * 2)
+            # random() ** 3 skews picks towards the start of the list (few common, many rare words)
+            text = " ".join(vocab[int(rng.random() ** 3 * len(vocab))] for _ in range(n))
+            if is_huge:
+                text += "\n" + CODE_TAIL
+            writer.write({
+                "original_url": f"https://example{i % 997}.com/page/{i}",
+                "archive_timestamp": f"{2000 + i % 20}0101000000",
+                "cleaned_text": text,
+            })
+
+
+class GzipSize:
+    """copy_expert() target that only keeps the gzip'ed size of what it is given"""
+    def __init__(self):
+        # wbits 31: gzip container, level 6 like gzip's default
+        self._deflate = zlib.compressobj(6, zlib.DEFLATED, 31)
+        self.size = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.size += len(self._deflate.compress(data))
+        return len(data)
+
+    def close(self):
+        self.size += len(self._deflate.flush())
+
+
+def sizes(cur):
+    cur.execute("""
+        SELECT pg_table_size('archived_documents'), pg_indexes_size('archived_documents'),
+               coalesce(sum(pg_column_size(cleaned_text)), 0), coalesce(sum(pg_column_size(cleaned_text_full)), 0),
+               count(cleaned_text_full), count(*)
+        FROM archived_documents
+    """)
+    table, indexes, text, full, with_full, rows = cur.fetchone()
+    dump = GzipSize()
+    cur.copy_expert(DUMP_SQL, dump)
+    dump.close()
+    return {"table": table, "indexes": indexes, "text": text, "full": full, "with_full": with_full,
+            "rows": rows, "dump_gz": dump.size}
+
+
+def categories(cur):
+    """{(url, timestamp): (category, cut)}; cut means the search body is shorter than the full text"""
+    cur.execute("SELECT original_url, archive_timestamp, category, cleaned_text_full IS NOT NULL FROM archived_documents")
+    return {(url, ts): (category, cut) for url, ts, category, cut in cur.fetchall()}
+
+
+def latency(conn, queries, repeat):
+    timings = {}
+    for q in queries:
+        runs = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            search_documents(conn, q, limit=20)
+            runs.append((time.perf_counter() - started) * 1000)
+        runs.sort()
+        timings[q] = (statistics.median(runs), runs[min(len(runs) - 1, int(len(runs) * 0.95))])
+    return timings
+
+
+def mb(n):
+    return n / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=800, help="average words per normal document")
+    parser.add_argument("--huge", type=float, default=0.05, help="share of huge documents")
+    parser.add_argument("--huge-words", type=int, default=60000, help="words per huge document")
+    parser.add_argument("--vocab", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    parser.add_argument("--keep", action="store_true", help="do not drop the bench_text_storage schema")
+    args = parser.parse_args()
+
+    dsn = os.environ.get("DATABASE_URL")
+    if not dsn:
+        raise SystemExit("DATABASE_URL not set.")
+
+    rng = random.Random(42)
+    vocab = vocabulary(args.vocab, rng)
+    queries = [vocab[0], vocab[len(vocab) // 50], vocab[-1], f"{vocab[1]} {vocab[200]}"]
+
+    admin = psycopg2.connect(dsn)
+    admin.autocommit = True
+    cur = admin.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+
+    tmp = tempfile.TemporaryDirectory()
+    data_file = os.path.join(tmp.name, "archive_data.jsonl")
+    bench_dsn = make_dsn(dsn, options=f"-c search_path={SCHEMA}")
+    try:
+        db = DBConnector(bench_dsn)
+        db.init_db(os.path.join(BASE_DIR, "db", "schema.sql"))
+
+        print(f"Writing {args.docs} documents (~{args.words} words, {args.huge:.0%} x {args.huge_words} words)...")
+        write_records(data_file, args.docs, args.words, args.huge, args.huge_words, vocab, rng)
+        print(f"JSONL: {mb(os.path.getsize(data_file)):.1f} MB, codec: "
+              f"{'zstd' if textstore.zstandard is not None else 'zlib (zstandard not installed)'}")
+
+        results = []
+        reference = None
+        conn = psycopg2.connect(bench_dsn)
+        # Searches must not hold locks across the next mode's TRUNCATE
+        conn.autocommit = True
+        for label, mode, compression in MODES:
+            cur.execute(f"TRUNCATE {SCHEMA}.archived_documents, {SCHEMA}.search_terms")
+            try:
+                cur.execute(f"ALTER TABLE {SCHEMA}.archived_documents ALTER COLUMN cleaned_text "
+                            f"SET COMPRESSION {compression}")
+            except psycopg2.Error as e:
+                print(f"{label}: skipped ({str(e).strip()})")
+                continue
+            started = time.perf_counter()
+            with mock.patch.dict(os.environ, {"ARCHIVE_TEXT_STORAGE": mode}), mock.patch("builtins.print"):
+                ok = db.insert_archive_data(data_file)
+            load_seconds = time.perf_counter() - started
+            cur.execute(f"VACUUM ANALYZE {SCHEMA}.archived_documents")
+            with conn.cursor() as bench_cur:
+                stats = sizes(bench_cur)
+                stored = categories(bench_cur)
+            reference = reference or stored
+            cut = [key for key, (_, is_cut) in stored.items() if is_cut]
+            differ = [key for key in stored if stored[key][0] != reference.get(key, (None,))[0]]
+            print(f"{label}: categories same as text: {not differ and len(stored) == len(reference)} "
+                  f"({len(differ)} differ, {len(cut)} rows past ARCHIVE_SEARCH_CHARS, "
+                  f"{sum(1 for key in cut if key in differ)} of them differ)")
+            latency(conn, queries, 2)  # warm the cache
+            results.append((label, ok, load_seconds, stats, latency(conn, queries, args.repeat)))
+        conn.close()
+
+        print(f"\n{'mode':<11} {'rows':>6} {'load s':>7} {'table MB':>9} {'index MB':>9} {'text MB':>8} "
+              f"{'full MB':>8} {'dump.gz MB':>11}")
+        for label, ok, load_seconds, s, _ in results:
+            note = "" if ok else "  (failed)"
+            print(f"{label:<11} {s['rows']:>6} {load_seconds:>7.1f} {mb(s['table']):>9.1f} {mb(s['indexes']):>9.1f} "
+                  f"{mb(s['text']):>8.1f} {mb(s['full']):>8.1f} {mb(s['dump_gz']):>11.1f}{note}")
+
+        print(f"\n{'query':<24}" + "".join(f" {label + ' ms':>20}" for label, *_ in results))
+        print(f"{'':<24}" + "".join(f" {'median / p95':>20}" for _ in results))
+        for q in queries:
+            cells = "".join(f" {f'{t[q][0]:.1f} / {t[q][1]:.1f}':>20}" for *_, t in results)
+            print(f"{q[:24]:<24}{cells}")
+    finally:
+        tmp.cleanup()
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.close()
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
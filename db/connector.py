@@ -1,22 +1,125 @@
-import os
+import hashlib
 import json
-import psycopg2
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from psycopg2.extras import execute_values
 from datetime import datetime
+from itertools import islice
+from archivist import metrics
+from archivist.classifier import detect_category
+from archivist.records import iter_records, iter_batches
+from archivist.textstore import storage_form
+from db import partition
+from db.pool import connection as pooled_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Session-local tables for DBConnector.bulk_load_archive_data
+STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS archive_staging (
+        seq BIGSERIAL,
+        original_url TEXT,
+        archive_timestamp TIMESTAMP WITH TIME ZONE,
+        cleaned_text TEXT,
+        cleaned_text_full BYTEA,
+        content_hash TEXT,
+        category VARCHAR(50)
+    );
+    CREATE TEMP TABLE IF NOT EXISTS archive_merge (
+        original_url TEXT,
+        archive_timestamp TIMESTAMP WITH TIME ZONE,
+        cleaned_text TEXT,
+        cleaned_text_full BYTEA,
+        content_hash TEXT,
+        category VARCHAR(50)
+    );
+"""
+
+# Same rules as insert_archive_data: last record wins per (url, ts), first one per (url, text),
+# text already stored for the URL is skipped
+MERGE_SQL = """
+    INSERT INTO archive_merge (original_url, archive_timestamp, cleaned_text, cleaned_text_full, content_hash, category)
+    SELECT u.original_url, u.archive_timestamp, u.cleaned_text, u.cleaned_text_full, u.content_hash, u.category
+    FROM (
+        SELECT DISTINCT ON (s.original_url, s.content_hash) s.*
+        FROM (
+            SELECT DISTINCT ON (original_url, archive_timestamp) *
+            FROM archive_staging
+            ORDER BY original_url, archive_timestamp, seq DESC
+        ) s
+        ORDER BY s.original_url, s.content_hash, s.seq
+    ) u
+    WHERE NOT EXISTS (
+        SELECT 1 FROM archived_documents d
+        WHERE d.original_url = u.original_url AND d.content_hash = u.content_hash
+    );
+"""
+
+UPSERT_FROM_MERGE_SQL = """
+    INSERT INTO archived_documents (original_url, archive_timestamp, cleaned_text, cleaned_text_full, content_hash, category)
+    SELECT original_url, archive_timestamp, cleaned_text, cleaned_text_full, content_hash, category FROM archive_merge
+    ON CONFLICT (original_url, archive_timestamp) DO UPDATE
+    SET cleaned_text = EXCLUDED.cleaned_text,
+        cleaned_text_full = EXCLUDED.cleaned_text_full,
+        content_hash = EXCLUDED.content_hash,
+        category = EXCLUDED.category
+    WHERE archived_documents.cleaned_text IS DISTINCT FROM EXCLUDED.cleaned_text
+       OR archived_documents.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+       OR archived_documents.category IS DISTINCT FROM EXCLUDED.category
+    RETURNING id;
+"""
+
+# COPY text format escapes (one translate() pass, so backslashes are never escaped twice)
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\x00": None})
+
+
+class CopyStream:
+    """File-like reader over rows for cursor.copy_expert(); rows are encoded as they are read"""
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self._pos = 0
+
+    @staticmethod
+    def _field(value):
+        if value is None:
+            return "\\N"
+        if isinstance(value, datetime):
+            value = value.isoformat(sep=" ")
+        if isinstance(value, bytes):
+            # bytea hex input; the backslash itself is escaped for COPY
+            return "\\\\x" + value.hex()
+        # PostgreSQL text cannot hold NUL characters; they are dropped
+        return str(value).translate(_COPY_ESCAPES)
+
+    def _line(self):
+        row = next(self._rows, None)
+        return None if row is None else "\t".join(self._field(v) for v in row) + "\n"
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            rest = [self._buffer[self._pos:]] + list(iter(self._line, None))
+            self._buffer, self._pos = "", 0
+            return "".join(rest)
+        # Refill only when less than size is left, so a multi-MB record is not re-copied on every read
+        while len(self._buffer) - self._pos < size:
+            line = self._line()
+            if line is None:
+                break
+            self._buffer, self._pos = self._buffer[self._pos:] + line, 0
+        chunk = self._buffer[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk
+
 
 class DBConnector:
     def __init__(self, db_url=None):
         self.db_url = db_url or os.environ.get("DATABASE_URL")
 
-    def get_connection(self):
-        if not self.db_url:
-            print("[DB] Error: DATABASE_URL not set.")
-            return None
-        try:
-            return psycopg2.connect(self.db_url)
-        except Exception as e:
-            print(f"[DB] Connection Error: {e}")
-            return None
+    def connection(self):
+        """Pooled connection (context manager); yields None if the database is unavailable"""
+        return pooled_connection(self.db_url)
 
     def _parse_isodate(self, date_str):
         if not date_str: return None
@@ -26,166 +129,484 @@ class DBConnector:
             return None
     
     def _detect_category(self, text):
-        """Deteksi kategori konten berdasarkan pola karakteristik"""
-        if not text:
-            return "General"
-        
-        # Convert to lowercase for easier matching
-        text_lower = text.lower()
-        
-        # Code detection: banyak simbol {}, (), function keywords
-        code_indicators = ['{', '}', 'function', 'class', 'def ', 'var ', 'const ', 'import ', 'return']
-        code_score = sum(text.count(indicator) for indicator in code_indicators)
-        
-        # Academic detection: citation patterns, years in parentheses, author names
-        academic_patterns = ['et al', 'references', 'abstract', 'journal', 'university', 'research']
-        academic_score = sum(text_lower.count(pattern) for pattern in academic_patterns)
-        # Check for year patterns (19xx, 20xx)
-        import re
-        year_matches = re.findall(r'\b(19|20)\d{2}\b', text)
-        academic_score += len(year_matches) * 2
-        
-        # News detection: journalist terms, date mentions
-        news_patterns = ['breaking', 'reported', 'according to', 'spokesperson', 'press release', 'journalist']
-        news_score = sum(text_lower.count(pattern) for pattern in news_patterns)
-        
-        # Forum/Discussion detection
-        forum_patterns = ['reply', 'quote', 'posted by', 'thread', 'username', 're:']
-        forum_score = sum(text_lower.count(pattern) for pattern in forum_patterns)
-        
-        # Determine category based on highest score
-        scores = {
-            'Code': code_score,
-            'Academic': academic_score,
-            'News': news_score,
-            'Forum': forum_score
-        }
-        
-        max_category = max(scores, key=scores.get)
-        max_score = scores[max_category]
-        
-        # Minimum threshold to classify (otherwise General)
-        if max_score >= 5:
-            return max_category
-        
-        return "General"
-
-    def insert_archive_data(self, json_file):
-        if not os.path.exists(json_file):
-            print(f"[DB] File {json_file} tidak ditemukan.")
+        """Deteksi kategori konten berdasarkan pola karakteristik (archivist/classifier.py)"""
+        return detect_category(text)
+
+    def _record_text(self, item):
+        """Full cleaned_text of a retriever record; PostgreSQL text cannot hold NUL characters, so they are dropped"""
+        return (item.get("cleaned_text") or "").replace("\x00", "")
+
+    def _content_hash(self, text):
+        """content_hash column: md5 of the full text (db/migrations/008_content_hash_full_text.sql).
+
+        Equals md5(coalesce(cleaned_text, '')) whenever cleaned_text is the full text.
+        """
+        return hashlib.md5((text or "").encode("utf-8", "surrogatepass")).hexdigest()
+
+    def _classify_pool(self):
+        """Process pool for category detection, or None to classify inline (DB_CLASSIFY_WORKERS=0)"""
+        workers = int(os.environ.get("DB_CLASSIFY_WORKERS", os.cpu_count() or 1))
+        if workers <= 1:
+            return None
+        try:
+            return ProcessPoolExecutor(max_workers=workers)
+        except Exception as e:
+            print(f"[DB] Process pool tidak tersedia ({e}), klasifikasi inline.")
+            return None
+
+    def _classify(self, texts, pool=None):
+        if pool is None:
+            return [self._detect_category(t) for t in texts]
+        # Chunks of a few documents keep IPC overhead low without leaving workers idle at the batch end
+        return list(pool.map(detect_category, texts, chunksize=8))
+
+    def insert_archive_data(self, data_file, batch_size=None, state=None):
+        """Streams records from the retriever output (JSONL, .jsonl.gz or legacy JSON array) in bounded batches.
+
+        With a PipelineState, records already committed by an interrupted run are skipped.
+        """
+        if not os.path.exists(data_file):
+            print(f"[DB] File {data_file} tidak ditemukan.")
             return False
 
-        conn = self.get_connection()
-        if not conn:
+        batch_size = batch_size or int(os.environ.get("DB_INSERT_BATCH_SIZE", 500))
+
+        with self.connection() as conn:
+            if not conn:
+                return False
+
+            classify_pool = self._classify_pool()
+            try:
+                query = """
+                    INSERT INTO archived_documents (original_url, archive_timestamp, cleaned_text, cleaned_text_full,
+                                                    content_hash, category)
+                    VALUES %s
+                    ON CONFLICT (original_url, archive_timestamp) DO UPDATE 
+                    SET cleaned_text = EXCLUDED.cleaned_text,
+                        cleaned_text_full = EXCLUDED.cleaned_text_full,
+                        content_hash = EXCLUDED.content_hash,
+                        category = EXCLUDED.category
+                    -- No new row version (WAL, dead tuples for VACUUM) when nothing changed;
+                    -- content_hash also catches changes past the search body in compressed mode
+                    WHERE archived_documents.cleaned_text IS DISTINCT FROM EXCLUDED.cleaned_text
+                       OR archived_documents.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+                       OR archived_documents.category IS DISTINCT FROM EXCLUDED.category
+                    RETURNING id
+                """
+
+                cur = conn.cursor()
+                stream = iter_records(data_file)
+                done = int(state.get("insert", data_file) or 0) if state is not None else 0
+                if done:
+                    print(f"[DB] Resume: {done} record pertama sudah diinsert, dilewati.")
+                    stream = islice(stream, done, None)
+
+                seen = done
+                total = 0
+                duplicates = 0
+                for batch in iter_batches(stream, batch_size):
+                    batch_started = time.perf_counter()
+                    seen += len(batch)
+                    records = {}
+                    full_texts = {}
+                    for item in batch:
+                        url = item.get("original_url")
+                        ts = item.get("archive_timestamp")
+                        text = self._record_text(item)
+
+                        if url:
+                            # Same snapshot twice in one statement would make ON CONFLICT fail; last one wins.
+                            # (url, ts, text, full, hash): text is the search body in ARCHIVE_TEXT_STORAGE=compressed,
+                            # the hash and the category always cover the full text
+                            records[(url, ts)] = ((url, self._parse_isodate(ts)) + storage_form(text)
+                                                  + (self._content_hash(text),))
+                            full_texts[(url, ts)] = text
+
+                    # Identical text for the same URL (another year, same page): keep the first snapshot.
+                    # Text already stored for the URL, unchanged or under another timestamp, is not rewritten.
+                    unique = {}
+                    for key, record in records.items():
+                        unique.setdefault((record[0], record[4]), key)
+                    keys = list(unique.values())
+                    stored = self._already_stored(cur, [records[key] for key in keys])
+                    kept = {key: records[key] for i, key in enumerate(keys) if i not in stored}
+                    duplicates += len(records) - len(kept)
+                    records = kept
+
+                    if records:
+                        # Auto-detect category, spread over the process pool
+                        with metrics.timer("db_classify_seconds"):
+                            categories = self._classify([full_texts[key] for key in records], classify_pool)
+                        rows = [r + (c,) for r, c in zip(records.values(), categories)]
+                        # Terms of rows about to be overwritten leave the autocomplete dictionary first
+                        emptied = self._remove_search_terms(cur, rows)
+                        # Use page_size=100 to batch inserts and avoid "server closed connection" on large payloads
+                        ids = [r[0] for r in execute_values(cur, query, rows, page_size=100, fetch=True)]
+                        self._add_search_terms(cur, ids, emptied)
+                        # Invalidates cached /search pages (web/cache.py) together with this batch
+                        self._bump_cache_generation(cur)
+                    # Commit per batch so a later failure keeps earlier batches
+                    conn.commit()
+                    if state is not None:
+                        state.mark("insert", data_file, str(seen))
+                    metrics.observe("db_batch_seconds", time.perf_counter() - batch_started, mode="insert")
+                    metrics.inc("db_records_total", len(records), result="written")
+                    metrics.inc("db_records_total", len(batch) - len(records), result="skipped")
+                    if records:
+                        total += len(records)
+                        print(f"[DB] Upsert batch {len(records)} data (total {total}, sudah ada/duplikat dilewati {duplicates}).")
+                cur.close()
+
+                if not seen:
+                    print("[DB] Tidak ada data JSON.")
+                    return False
+                if not total and not done and not duplicates:
+                    print("[DB] Tidak ada record valid untuk diinsert.")
+                    return True
+
+                print(f"[DB] Berhasil upsert {total} data, {duplicates} snapshot sudah ada/duplikat dilewati.")
+                return True
+
+            except Exception as e:
+                try:
+                    if conn: conn.rollback()
+                except:
+                    pass # Connection was likely already closed
+                print(f"[DB] Transaction Error: {e}")
+                return False
+            finally:
+                if classify_pool is not None:
+                    classify_pool.shutdown()
+
+    def bulk_load_archive_data(self, data_file, chunk_size=None, state=None):
+        """High-throughput variant of insert_archive_data for large backfills.
+
+        Each chunk is streamed with COPY into a temporary staging table and merged into
+        archived_documents with a single INSERT ... SELECT ... ON CONFLICT. Deduplication,
+        skipping of already stored text and the search_terms bookkeeping are the same as in
+        insert_archive_data. Prints rows/s per chunk and for the whole file.
+        """
+        if not os.path.exists(data_file):
+            print(f"[DB] File {data_file} tidak ditemukan.")
             return False
 
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            if not data:
-                print("[DB] Tidak ada data JSON.")
+        chunk_size = chunk_size or int(os.environ.get("DB_COPY_CHUNK", 10000))
+
+        with self.connection() as conn:
+            if not conn:
                 return False
 
-            records = []
-            for item in data:
-                url = item.get("original_url")
-                ts = item.get("archive_timestamp")
-                text = item.get("cleaned_text", "")
-                
-                # Auto-detect category
-                category = self._detect_category(text)
-                
-                if url:
-                    records.append((url, self._parse_isodate(ts), text, category))
-
-            if not records:
-                print("[DB] Tidak ada record valid untuk diinsert.")
+            classify_pool = self._classify_pool()
+            try:
+                cur = conn.cursor()
+                cur.execute(STAGING_SQL)
+
+                stream = iter_records(data_file)
+                done = int(state.get("insert", data_file) or 0) if state is not None else 0
+                if done:
+                    print(f"[DB] Resume: {done} record pertama sudah diinsert, dilewati.")
+                    stream = islice(stream, done, None)
+
+                seen = done
+                total = 0
+                copied = 0
+                started = time.perf_counter()
+                for batch in iter_batches(stream, chunk_size):
+                    chunk_started = time.perf_counter()
+                    seen += len(batch)
+                    items = [item for item in batch if item.get("original_url")]
+                    texts = [self._record_text(item) for item in items]
+                    stored = [storage_form(text) for text in texts]
+                    # Categories come from the full text, not the search body of ARCHIVE_TEXT_STORAGE=compressed
+                    if classify_pool is not None:
+                        # Results arrive in order while later records are still being classified
+                        categories = classify_pool.map(detect_category, texts, chunksize=8)
+                    else:
+                        categories = map(self._detect_category, texts)
+                    rows = ((item.get("original_url"), self._parse_isodate(item.get("archive_timestamp")), body, full,
+                             self._content_hash(text), category)
+                            for item, text, (body, full), category in zip(items, texts, stored, categories))
+
+                    cur.execute("TRUNCATE archive_staging, archive_merge")
+                    cur.copy_expert("COPY archive_staging (original_url, archive_timestamp, cleaned_text, cleaned_text_full, "
+                                    "content_hash, category) FROM STDIN", CopyStream(rows))
+                    copied += len(items)
+                    cur.execute(MERGE_SQL)
+
+                    emptied = self._remove_search_terms(cur, table="archive_merge")
+                    cur.execute(UPSERT_FROM_MERGE_SQL)
+                    ids = [r[0] for r in cur.fetchall()]
+                    self._add_search_terms(cur, ids, emptied)
+                    self._bump_cache_generation(cur)
+                    conn.commit()
+                    if state is not None:
+                        state.mark("insert", data_file, str(seen))
+
+                    total += len(ids)
+                    elapsed = time.perf_counter() - chunk_started
+                    metrics.observe("db_batch_seconds", elapsed, mode="copy")
+                    metrics.inc("db_records_total", len(ids), result="written")
+                    metrics.inc("db_records_total", len(batch) - len(ids), result="skipped")
+                    print(f"[DB] COPY chunk {len(items)} record -> {len(ids)} ditulis "
+                          f"({len(items) / max(elapsed, 1e-9):.0f} rows/s, total {total}).")
+                cur.close()
+
+                if not seen:
+                    print("[DB] Tidak ada data JSON.")
+                    return False
+
+                elapsed = time.perf_counter() - started
+                print(f"[DB] Bulk load selesai: {copied} record dalam {elapsed:.1f}s "
+                      f"({copied / max(elapsed, 1e-9):.0f} rows/s), {total} ditulis, "
+                      f"{copied - total} sudah ada/duplikat dilewati.")
                 return True
 
-            query = """
-                INSERT INTO archived_documents (original_url, archive_timestamp, cleaned_text, category)
-                VALUES %s
-                ON CONFLICT (original_url, archive_timestamp) DO UPDATE 
-                SET cleaned_text = EXCLUDED.cleaned_text,
-                    category = EXCLUDED.category;
-            """
-            
-            cur = conn.cursor()
-            # Use page_size=100 to batch inserts and avoid "server closed connection" on large payloads
-            execute_values(cur, query, records, page_size=100)
-            conn.commit()
-            print(f"[DB] Berhasil upsert {len(records)} data.")
-            cur.close()
-            return True
+            except Exception as e:
+                try:
+                    if conn: conn.rollback()
+                except:
+                    pass # Connection was likely already closed
+                print(f"[DB] Bulk Load Error: {e}")
+                return False
+            finally:
+                if classify_pool is not None:
+                    classify_pool.shutdown()
 
-        except Exception as e:
+    def save_run_report(self, report):
+        """Stores a main.py run report in pipeline_runs (db/migrations/005_pipeline_runs.sql)"""
+        with self.connection() as conn:
+            if not conn:
+                return False
             try:
-                if conn: conn.rollback()
-            except:
-                pass # Connection was likely already closed
-            print(f"[DB] Transaction Error: {e}")
-            return False
-        finally:
-            conn.close()
+                cur = conn.cursor()
+                cur.execute("""
+                    INSERT INTO pipeline_runs (started_at, finished_at, status, report)
+                    VALUES (%s, %s, %s, %s)
+                """, (report["started_at"], report["finished_at"], report["status"], json.dumps(report)))
+                conn.commit()
+                cur.close()
+                return True
+            except Exception as e:
+                print(f"[DB] Gagal menyimpan run report: {e}")
+                try: conn.rollback()
+                except: pass
+                return False
+
+    def latest_run_report(self):
+        """Report of the most recent pipeline run, or None"""
+        with self.connection() as conn:
+            if not conn:
+                return None
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT report FROM pipeline_runs ORDER BY finished_at DESC LIMIT 1")
+                row = cur.fetchone()
+                cur.close()
+                return row[0] if row else None
+            except Exception as e:
+                print(f"[DB] Gagal membaca run report: {e}")
+                return None
+
+    def _already_stored(self, cur, records):
+        """Positions in records (url, ts, text, full, hash) whose text is already stored for that URL.
+
+        Covers unchanged re-ingests (same timestamp) and identical captures from another
+        timestamp alike. Uses content_hash (hash of the full text) and idx_archived_documents_url_hash
+        (db/migrations/004_content_hash.sql, 008_content_hash_full_text.sql).
+        """
+        if not records:
+            return set()
+        cur.execute("""
+            SELECT v.i - 1
+            FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS v (url, hash, i)
+            WHERE EXISTS (
+                SELECT 1 FROM archived_documents d
+                WHERE d.original_url = v.url AND d.content_hash = v.hash
+            )
+        """, ([r[0] for r in records], [r[4] for r in records]))
+        return {row[0] for row in cur.fetchall()}
+
+    def stored_snapshots(self, urls):
+        """{(original_url, 'YYYYmmddHHMMSS')} already in archived_documents for urls; empty if the DB is unavailable"""
+        stored = set()
+        if not urls:
+            return stored
+        with self.connection() as conn:
+            if not conn:
+                return stored
+            try:
+                cur = conn.cursor()
+                # Same session time zone as the naive timestamps written by insert_archive_data
+                cur.execute("""
+                    SELECT original_url, to_char(archive_timestamp, 'YYYYMMDDHH24MISS')
+                    FROM archived_documents
+                    WHERE original_url = ANY(%s) AND archive_timestamp IS NOT NULL
+                """, (list(urls),))
+                stored = set(cur.fetchall())
+                cur.close()
+            except Exception as e:
+                print(f"[DB] Error membaca snapshot tersimpan: {e}")
+        return stored
+
+    # Per-lexeme document and occurrence counts, same numbers ts_stat() reports
+    _TERM_COUNTS = """
+        SELECT u.lexeme AS word, count(*) AS ndoc, sum(coalesce(array_length(u.positions, 1), 1)) AS nentry
+        FROM {source} d, unnest(d.search_id) u
+        WHERE {where}
+        GROUP BY u.lexeme
+    """
+
+    def _remove_search_terms(self, cur, rows=None, table=None):
+        """Subtracts the current terms of existing documents matching rows (url, ts, ...) from search_terms.
+
+        With table, the (original_url, archive_timestamp) pairs are read from that table instead.
+        Returns the words whose document count dropped to zero.
+        """
+        if table is not None:
+            pairs, params = f"SELECT original_url, archive_timestamp FROM {table}", None
+        else:
+            pairs = "SELECT * FROM unnest(%s::text[], %s::timestamptz[])"
+            params = ([r[0] for r in rows], [r[1] for r in rows])
+        cur.execute("""
+            UPDATE search_terms t
+            SET ndoc = t.ndoc - s.ndoc, nentry = t.nentry - s.nentry
+            FROM ({counts}) s
+            WHERE t.word = s.word
+            RETURNING t.word, t.ndoc
+        """.format(counts=self._TERM_COUNTS.format(
+            source="archived_documents", where=f"(d.original_url, d.archive_timestamp) IN ({pairs})")), params)
+        return [word for word, ndoc in cur.fetchall() if ndoc <= 0]
+
+    def _remove_table_terms(self, cur, table):
+        """Subtracts every document of table (e.g. a partition about to be detached) from search_terms"""
+        cur.execute("""
+            UPDATE search_terms t
+            SET ndoc = t.ndoc - s.ndoc, nentry = t.nentry - s.nentry
+            FROM ({counts}) s
+            WHERE t.word = s.word
+            RETURNING t.word, t.ndoc
+        """.format(counts=self._TERM_COUNTS.format(source=table, where="TRUE")))
+        return [word for word, ndoc in cur.fetchall() if ndoc <= 0]
+
+    def _add_search_terms(self, cur, ids, emptied=()):
+        """Adds the terms of freshly written documents to search_terms (incremental /suggest dictionary)"""
+        if ids:
+            cur.execute("""
+                INSERT INTO search_terms (word, ndoc, nentry)
+                {counts}
+                ON CONFLICT (word) DO UPDATE
+                SET ndoc = search_terms.ndoc + EXCLUDED.ndoc,
+                    nentry = search_terms.nentry + EXCLUDED.nentry
+            """.format(counts=self._TERM_COUNTS.format(source="archived_documents", where="d.id = ANY(%s)")), (ids,))
+        if emptied:
+            # Words that no document contains any more
+            cur.execute("DELETE FROM search_terms WHERE word = ANY(%s) AND ndoc <= 0", (list(emptied),))
+
+    def _bump_cache_generation(self, cur):
+        cur.execute("""
+            UPDATE cache_generation
+            SET generation = generation + 1, updated_at = NOW()
+            WHERE name = 'archived_documents';
+        """)
 
     def init_db(self, schema_path):
         if not os.path.exists(schema_path):
              print(f"[DB] Schema file not found: {schema_path}")
              return False
 
-        conn = self.get_connection()
-        if not conn: return False
-        try:
-            with open(schema_path, 'r') as f:
-                schema_sql = f.read()
-            cur = conn.cursor()
-            cur.execute(schema_sql)
+        with self.connection() as conn:
+            if not conn:
+                return False
+            try:
+                with open(schema_path, 'r') as f:
+                    schema_sql = f.read()
+                cur = conn.cursor()
+                cur.execute(schema_sql)
+                conn.commit()
+                cur.close()
+                self.apply_migrations(conn)
+                print(f"[DB] Database initialized successfully.")
+                return True
+            except Exception as e:
+                print(f"[DB] Init Error: {e}")
+                try: conn.rollback()
+                except: pass
+                return False
+
+    def apply_migrations(self, conn, migrations_dir=MIGRATIONS_DIR):
+        """Runs db/migrations/*.sql that have not been applied yet, each in its own transaction"""
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+            );
+        """)
+        conn.commit()
+
+        for name in sorted(f for f in os.listdir(migrations_dir) if f.endswith(".sql")):
+            # Web workers and the pipeline may start at the same time; serialize on an advisory lock
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('nexus_ignis_migrations'))")
+            cur.execute("SELECT 1 FROM schema_migrations WHERE name = %s", (name,))
+            if cur.fetchone():
+                conn.commit()
+                continue
+
+            with open(os.path.join(migrations_dir, name), "r") as f:
+                cur.execute(f.read())
+            cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
             conn.commit()
-            cur.close()
-            print(f"[DB] Database initialized successfully.")
-            return True
-        except Exception as e:
-            print(f"[DB] Init Error: {e}")
-            try: conn.rollback()
-            except: pass
-            return False
-        finally:
-            conn.close()
+            print(f"[DB] Migration applied: {name}")
+        cur.close()
 
     def fix_constraints(self):
         """Fixes the UNIQUE constraint issue on archived_documents"""
-        conn = self.get_connection()
-        if not conn: return
-        try:
-            cur = conn.cursor()
-            # 1. Drop old constraint if exists (default name often archived_documents_original_url_key)
-            cur.execute("""
-                DO $$
-                BEGIN
-                    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'archived_documents_original_url_key') THEN
-                        ALTER TABLE archived_documents DROP CONSTRAINT archived_documents_original_url_key;
-                    END IF;
-                END $$;
-            """)
+        with self.connection() as conn:
+            if not conn:
+                return
+            try:
+                cur = conn.cursor()
+                # 1. Drop old constraint if exists (default name often archived_documents_original_url_key)
+                cur.execute("""
+                    DO $$
+                    BEGIN
+                        IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'archived_documents_original_url_key') THEN
+                            ALTER TABLE archived_documents DROP CONSTRAINT archived_documents_original_url_key;
+                        END IF;
+                    END $$;
+                """)
             
-            # 2. Add new constraint if missing
-            cur.execute("""
-                DO $$
-                BEGIN
-                    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'archived_documents_url_ts_unique') THEN
-                        ALTER TABLE archived_documents ADD CONSTRAINT archived_documents_url_ts_unique UNIQUE (original_url, archive_timestamp);
-                    END IF;
-                END $$;
-            """)
+                # 2. Add new constraint if missing
+                cur.execute("""
+                    DO $$
+                    BEGIN
+                        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'archived_documents_url_ts_unique') THEN
+                            ALTER TABLE archived_documents ADD CONSTRAINT archived_documents_url_ts_unique UNIQUE (original_url, archive_timestamp);
+                        END IF;
+                    END $$;
+                """)
             
-            conn.commit()
-            cur.close()
-            print("[DB] Schema constraints validated.")
-        except Exception as e:
-            # Clean up duplicates if adding constraint failed (Optional but good)
-            print(f"[DB] Schema Fix Error (Non-fatal): {e}")
-            try: conn.rollback()
-            except: pass
-        finally:
-            conn.close()
+                conn.commit()
+                cur.close()
+                print("[DB] Schema constraints validated.")
+            except Exception as e:
+                # Clean up duplicates if adding constraint failed (Optional but good)
+                print(f"[DB] Schema Fix Error (Non-fatal): {e}")
+                try: conn.rollback()
+                except: pass
+
+    def ensure_partitions(self):
+        """Creates the yearly archived_documents partitions up to next year (no-op for a plain table, see db/partition.py)"""
+        with self.connection() as conn:
+            if not conn:
+                return []
+            try:
+                created = partition.ensure_partitions(conn)
+                if created:
+                    print(f"[DB] Partisi baru archived_documents: {created}")
+                return created
+            except Exception as e:
+                print(f"[DB] Partition Error (Non-fatal): {e}")
+                try: conn.rollback()
+                except: pass
+                return []
@@ -150,24 +150,46 @@ LIMIT 20;
 
 
 -- 11. CLEANUP OLD DATA (Optional)
--- Jika database terlalu besar, archive data lama
--- HATI-HATI: Backup dulu sebelum delete!
+-- Jika database terlalu besar, lepas partisi tahun lama dari archived_documents
 -- =====================================
 
--- Step 1: Create archive table (uncomment untuk execute)
--- CREATE TABLE archived_documents_archive AS 
--- SELECT * FROM archived_documents 
--- WHERE created_at < NOW() - INTERVAL '6 months';
+-- Tidak lagi: copy ke archived_documents_archive + DELETE + VACUUM FULL
+-- (VACUUM FULL mengunci seluruh tabel selama ditulis ulang).
+-- archived_documents dipartisi per tahun archive_timestamp (db/partition.py):
 
--- Step 2: Verify count
--- SELECT count(*) FROM archived_documents_archive;
+-- Sekali saja: ubah tabel biasa menjadi tabel berpartisi (saat pipeline tidak jalan)
+--   python -m db.partition migrate
 
--- Step 3: Delete dari main table (BACKUP DULU!)
--- DELETE FROM archived_documents 
--- WHERE created_at < NOW() - INTERVAL '6 months';
+-- Lihat partisi, jumlah baris dan ukuran
+--   python -m db.partition status
 
--- Step 4: Reclaim space
--- VACUUM FULL archived_documents;
+-- Lepas partisi sebelum tahun 2005 dan pindahkan ke schema "archive"
+-- (--compact: buang kolom tsvector + VACUUM FULL hanya di salinan arsip, --drop: hapus)
+--   python -m db.partition retain --before 2005 --compact
+
+-- Partisi yang ada:
+-- SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound,
+--        pg_size_pretty(pg_total_relation_size(c.oid)) AS size
+-- FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+-- WHERE i.inhparent = 'archived_documents'::regclass
+-- ORDER BY c.relname;
+
+
+-- 12. KOMPRESI cleaned_text (Optional)
+-- =====================================
+
+-- PostgreSQL 14+: LZ4 untuk TOAST cleaned_text (lebih cepat dari pglz, ukuran mirip).
+-- Hanya berlaku untuk nilai yang ditulis sesudahnya.
+-- ALTER TABLE archived_documents ALTER COLUMN cleaned_text SET COMPRESSION lz4;
+
+-- Lebih hemat: ARCHIVE_TEXT_STORAGE=compressed (archivist/textstore.py, db/migrations/007).
+-- Ukuran dan latency kedua mode: python -m benchmarks.bench_text_storage
+
+-- Berapa dokumen menyimpan teks lengkap terkompresi terpisah
+-- SELECT count(cleaned_text_full) AS compressed_docs,
+--        pg_size_pretty(sum(pg_column_size(cleaned_text))) AS search_body,
+--        pg_size_pretty(sum(pg_column_size(cleaned_text_full))) AS full_text
+-- FROM archived_documents;
 
 
 -- =====================================
@@ -178,4 +200,4 @@ LIMIT 20;
 -- WEEKLY: Run #6 (VACUUM ANALYZE)
 -- MONTHLY: Run #7 (REINDEX)
 -- QUARTERLY: Check #8 (bloat check)
--- YEARLY: Consider #11 (archive old data)
+-- YEARLY: Consider #11 (retain partisi lama)
@@ -0,0 +1,23 @@
+-- Stored tsvector columns untuk /search (Indonesian + English).
+-- Sebelumnya to_tsvector() dihitung ulang per query dan hanya versi 'indonesian'
+-- yang punya index, sehingga cabang 'english' dari OR selalu sequential scan.
+-- Kolom GENERATED ... STORED dihitung sekali saat INSERT/UPDATE.
+
+ALTER TABLE archived_documents
+    ADD COLUMN IF NOT EXISTS search_id tsvector
+        GENERATED ALWAYS AS (to_tsvector('indonesian', coalesce(cleaned_text, ''))) STORED;
+
+ALTER TABLE archived_documents
+    ADD COLUMN IF NOT EXISTS search_en tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(cleaned_text, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_archived_documents_search_id
+ON archived_documents
+USING GIN (search_id);
+
+CREATE INDEX IF NOT EXISTS idx_archived_documents_search_en
+ON archived_documents
+USING GIN (search_en);
+
+-- Expression index lama digantikan idx_archived_documents_search_id
+DROP INDEX IF EXISTS idx_archived_documents_search;
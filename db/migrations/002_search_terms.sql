@@ -0,0 +1,19 @@
+-- Kamus term untuk autocomplete /suggest.
+-- Sebelumnya /suggest menjalankan ts_stat() atas seluruh korpus di setiap ketikan.
+-- Sekarang DBConnector.insert_archive_data memperbarui tabel ini per batch,
+-- dan web app memuatnya ke memori (web/suggest.py).
+
+CREATE TABLE IF NOT EXISTS search_terms (
+    word TEXT PRIMARY KEY,
+    ndoc INTEGER NOT NULL DEFAULT 0,    -- jumlah dokumen yang memuat kata ini
+    nentry INTEGER NOT NULL DEFAULT 0   -- total kemunculan (sama seperti ts_stat)
+);
+
+CREATE INDEX IF NOT EXISTS idx_search_terms_nentry
+ON search_terms (nentry DESC);
+
+-- Backfill satu kali dari dokumen yang sudah ada
+INSERT INTO search_terms (word, ndoc, nentry)
+SELECT word, ndoc, nentry
+FROM ts_stat('SELECT search_id FROM archived_documents')
+ON CONFLICT (word) DO NOTHING;
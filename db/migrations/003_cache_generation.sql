@@ -0,0 +1,12 @@
+-- Generation counter untuk invalidasi cache hasil /search (web/cache.py).
+-- DBConnector.insert_archive_data menaikkan counter ini di transaksi yang sama
+-- dengan upsert, sehingga cache web tidak pernah menyajikan hasil sebelum ingest.
+
+CREATE TABLE IF NOT EXISTS cache_generation (
+    name TEXT PRIMARY KEY,
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO cache_generation (name) VALUES ('archived_documents')
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,12 @@
+-- Hash isi cleaned_text untuk dedup snapshot.
+-- Wayback sering menyimpan halaman yang identik di tahun berbeda; tanpa ini
+-- setiap snapshot menjadi baris archived_documents sendiri dengan teks yang sama.
+-- DBConnector.insert_archive_data melewati record yang (original_url, content_hash)-nya
+-- sudah ada dengan timestamp lain; index di bawah membuat cek itu murah.
+
+ALTER TABLE archived_documents
+    ADD COLUMN IF NOT EXISTS content_hash TEXT
+        GENERATED ALWAYS AS (md5(coalesce(cleaned_text, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_archived_documents_url_hash
+ON archived_documents (original_url, content_hash);
@@ -0,0 +1,12 @@
+-- Laporan tiap run main.py (timer per stage, counter, histogram latency/bytes),
+-- ditulis oleh DBConnector.save_run_report dan dibaca endpoint /metrics web app.
+
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    id SERIAL PRIMARY KEY,
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    finished_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    report JSONB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_finished_at ON pipeline_runs (finished_at DESC);
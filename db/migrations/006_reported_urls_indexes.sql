@@ -0,0 +1,6 @@
+-- Index untuk feed "recent reports" (web/feed.py): homepage mengambil 20 laporan terbaru,
+-- /api/recent-urls 20 terbaru per status. Tanpa index keduanya sort seluruh tabel.
+-- (status, created_at) juga dipakai main.py/Collector saat memilih URL PENDING/PROCESSING.
+
+CREATE INDEX IF NOT EXISTS idx_reported_urls_created_at ON reported_urls (created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_reported_urls_status_created_at ON reported_urls (status, created_at DESC);
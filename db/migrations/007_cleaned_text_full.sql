@@ -0,0 +1,12 @@
+-- Teks lengkap terkompresi untuk ARCHIVE_TEXT_STORAGE=compressed (archivist/textstore.py).
+-- Di mode itu cleaned_text hanya berisi search body (spasi dinormalisasi, maks
+-- ARCHIVE_SEARCH_CHARS karakter) yang dipakai tsvector dan ts_headline;
+-- teks aslinya disimpan di sini sebagai frame zstd (atau zlib), NULL bila
+-- cleaned_text sudah sama dengan teks lengkap. Mode text (default) selalu menulis NULL.
+
+ALTER TABLE archived_documents
+    ADD COLUMN IF NOT EXISTS cleaned_text_full BYTEA;
+
+-- Sudah terkompresi: TOAST langsung memindahkannya ke tabel toast tanpa mencoba pglz lagi
+ALTER TABLE archived_documents
+    ALTER COLUMN cleaned_text_full SET STORAGE EXTERNAL;
@@ -0,0 +1,11 @@
+-- content_hash menjadi kolom biasa yang diisi DBConnector: md5 teks lengkap.
+-- Sebagai kolom generated ia hanya melihat cleaned_text, yang di
+-- ARCHIVE_TEXT_STORAGE=compressed cuma search body (maks ARCHIVE_SEARCH_CHARS);
+-- snapshot yang baru berbeda setelah batas itu dianggap identik dan dibuang
+-- oleh dedup, dan perubahan cleaned_text_full tidak terdeteksi saat upsert.
+-- Nilai lama tetap (mode text: sama persis); baris mode compressed yang lama
+-- mendapat hash teks lengkap saat ditulis ulang. Hanya metadata, tanpa rewrite
+-- tabel, dan berlaku juga untuk partisi (db/partition.py).
+
+ALTER TABLE archived_documents
+    ALTER COLUMN content_hash DROP EXPRESSION IF EXISTS;
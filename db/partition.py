@@ -0,0 +1,351 @@
+"""Range partitioning of archived_documents by archive_timestamp, one partition per capture year.
+
+    python -m db.partition status
+    python -m db.partition migrate [--batch 5000] [--drop-old]
+    python -m db.partition ensure
+    python -m db.partition retain --before 2005 [--drop] [--compact]
+
+The partition key is archive_timestamp because every unique index of a
+partitioned table must contain it, and the upserts in db/connector.py rely on
+UNIQUE (original_url, archive_timestamp); created_at would rule that out. The
+old id primary key becomes a plain index on id. Rows without a timestamp (and
+anything outside the yearly ranges) land in archived_documents_default.
+Searches with a year range (web/search.py, ?year_from= / ?year_to=) only
+scan the partitions of those years; without one every partition's GIN
+indexes are searched.
+
+migrate copies an existing plain table into a new partitioned one in id
+order, committing every --batch rows, so the table stays readable the whole
+time. It then takes an EXCLUSIVE lock (reads continue), copies the rows that
+arrived meanwhile and swaps the table names in one short transaction. The old
+table is kept as archived_documents_unpartitioned unless --drop-old is given.
+Run it while the pipeline is not ingesting: updates to rows that were
+already copied are not carried over.
+
+ensure creates missing yearly partitions up to next year; main.py calls it in
+its pre-flight checks (DBConnector.ensure_partitions).
+
+retain replaces the copy + DELETE + VACUUM FULL of db/maintenance.sql: each
+partition older than --before leaves search_terms, is detached (a catalog
+change; the lock on archived_documents is held for milliseconds and never
+waits longer than PARTITION_LOCK_TIMEOUT) and is moved to the archive schema
+(PARTITION_ARCHIVE_SCHEMA) or dropped. --compact drops the tsvector columns of
+the archived copy and rewrites only that table.
+"""
+import argparse
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+PARENT = "archived_documents"
+NEW_PARENT = "archived_documents_partitioned"
+OLD_SUFFIX = "_unpartitioned"
+DEFAULT_PARTITION = "archived_documents_default"
+# Wayback Machine captures start in 1996
+FIRST_YEAR = 1996
+PARTITION_RE = re.compile(r"^archived_documents_y(\d{4})$")
+
+
+def partition_name(year):
+    return f"{PARENT}_y{year}"
+
+
+def is_partitioned(cur, table=PARENT):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def partitions(cur, table=PARENT):
+    """(name, bound, estimated rows, total bytes) per partition"""
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint, pg_total_relation_size(c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+    """, (table,))
+    return cur.fetchall()
+
+
+def partition_years(cur, table=PARENT):
+    years = []
+    for name, *_ in partitions(cur, table):
+        match = PARTITION_RE.match(name)
+        if match:
+            years.append(int(match.group(1)))
+    return sorted(years)
+
+
+def create_partition(cur, year, table=PARENT):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {partition_name(year)} PARTITION OF {table}
+        FOR VALUES FROM (%s) TO (%s)
+    """, (f"{year}-01-01 00:00:00+00", f"{year + 1}-01-01 00:00:00+00"))
+
+
+def ensure_partitions(conn, ahead=1):
+    """Creates missing yearly partitions up to the current year + ahead; returns the years created.
+
+    Starts at the oldest existing partition, so years removed by retain are
+    not recreated (late rows for them go to the default partition).
+    """
+    cur = conn.cursor()
+    if not is_partitioned(cur):
+        cur.close()
+        return []
+    existing = partition_years(cur)
+    first = existing[0] if existing else FIRST_YEAR
+    created = []
+    for year in range(first, datetime.now(timezone.utc).year + ahead + 1):
+        if year in existing:
+            continue
+        cur.execute("SAVEPOINT ensure_partition")
+        try:
+            create_partition(cur, year)
+            cur.execute("RELEASE SAVEPOINT ensure_partition")
+            created.append(year)
+        except Exception as e:
+            # Usually rows for that year already sit in the default partition
+            cur.execute("ROLLBACK TO SAVEPOINT ensure_partition")
+            print(f"[Partition] Gagal membuat partisi {year}: {e}")
+    conn.commit()
+    cur.close()
+    return created
+
+
+def _columns(cur, table):
+    """Writable (non-generated) columns in table order"""
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """, (table,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def _indexes(cur, table):
+    """(name, definition after USING, is_unique, is_primary, constraint definition or None)"""
+    cur.execute("""
+        SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisunique, i.indisprimary,
+               (SELECT pg_get_constraintdef(k.oid) FROM pg_constraint k WHERE k.conindid = i.indexrelid
+                AND k.conrelid = i.indrelid)
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(%s)
+        ORDER BY c.relname
+    """, (table,))
+    return [(name, definition.split(" USING ", 1)[1], unique, primary, constraint)
+            for name, definition, unique, primary, constraint in cur.fetchall()]
+
+
+def _copy_rows(cur, columns, after_id, limit=None):
+    """Copies rows with id > after_id into the new table; returns (rows, last id)"""
+    cols = ", ".join(columns)
+    cur.execute(f"""
+        WITH moved AS (
+            INSERT INTO {NEW_PARENT} ({cols})
+            SELECT {cols} FROM {PARENT} WHERE id > %s ORDER BY id {"LIMIT %s" if limit else ""}
+            RETURNING id
+        )
+        SELECT count(*), max(id) FROM moved
+    """, (after_id, limit) if limit else (after_id,))
+    count, last_id = cur.fetchone()
+    return count, (last_id if last_id is not None else after_id)
+
+
+def migrate(conn, batch_size=5000, drop_old=False, lock_timeout="10s"):
+    """Converts a plain archived_documents into the partitioned layout (see module docstring)"""
+    cur = conn.cursor()
+    if is_partitioned(cur):
+        print("[Partition] archived_documents sudah dipartisi.")
+        return True
+
+    cur.execute(f"""
+        SELECT extract(year FROM min(archive_timestamp AT TIME ZONE 'UTC'))::int,
+               extract(year FROM max(archive_timestamp AT TIME ZONE 'UTC'))::int, count(*)
+        FROM {PARENT}
+    """)
+    min_year, max_year, total = cur.fetchone()
+    first = min(FIRST_YEAR, min_year or FIRST_YEAR)
+    last = max(datetime.now(timezone.utc).year + 1, max_year or 0)
+    columns = _columns(cur, PARENT)
+    indexes = _indexes(cur, PARENT)
+
+    # Leftover of an interrupted run: start over
+    cur.execute(f"DROP TABLE IF EXISTS {NEW_PARENT} CASCADE")
+    cur.execute(f"""
+        CREATE TABLE {NEW_PARENT} (
+            LIKE {PARENT} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS INCLUDING STORAGE
+        ) PARTITION BY RANGE (archive_timestamp)
+    """)
+    for year in range(first, last + 1):
+        create_partition(cur, year, table=NEW_PARENT)
+    cur.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {NEW_PARENT} DEFAULT")
+    conn.commit()
+    print(f"[Partition] {last - first + 1} partisi tahunan ({first}-{last}) + default dibuat, "
+          f"menyalin {total} baris...")
+
+    started = time.perf_counter()
+    copied, last_id = 0, 0
+    while True:
+        count, last_id = _copy_rows(cur, columns, last_id, batch_size)
+        conn.commit()
+        if not count:
+            break
+        copied += count
+        elapsed = time.perf_counter() - started
+        print(f"  [Partition] {copied}/{total} baris ({copied / elapsed:.0f} baris/detik)")
+
+    # Indexes are built once the data is in; the ones that will take over an old name get a
+    # temporary name until the swap
+    renames = []
+    for name, using, unique, primary, constraint in indexes:
+        if primary:
+            # A primary key would have to include archive_timestamp; ids stay unique through the sequence
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {PARENT}_id_idx ON {NEW_PARENT} (id)")
+        elif (unique or constraint) and "archive_timestamp" not in (constraint or using):
+            print(f"[Partition] Index {name} dilewati: unique tanpa archive_timestamp tidak didukung.")
+        elif constraint:
+            cur.execute(f"ALTER TABLE {NEW_PARENT} ADD CONSTRAINT {name}_p {constraint}")
+            renames.append(name)
+        else:
+            cur.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name}_p ON {NEW_PARENT} USING {using}")
+            renames.append(name)
+    conn.commit()
+    print(f"[Partition] {len(indexes)} index dibuat ulang.")
+
+    # Swap: writers wait on the lock, readers keep going until the renames
+    try:
+        cur.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+        cur.execute(f"LOCK TABLE {PARENT} IN EXCLUSIVE MODE")
+        count, last_id = _copy_rows(cur, columns, last_id)
+        cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (PARENT,))
+        sequence = cur.fetchone()[0]
+        cur.execute(f"ALTER TABLE {PARENT} RENAME TO {PARENT}{OLD_SUFFIX}")
+        for name, *_ in indexes:
+            # Renaming a constraint's index renames the constraint too
+            cur.execute(f"ALTER INDEX {name} RENAME TO {name}{OLD_SUFFIX}")
+        cur.execute(f"ALTER TABLE {NEW_PARENT} RENAME TO {PARENT}")
+        for name in renames:
+            cur.execute(f"ALTER INDEX {name}_p RENAME TO {name}")
+        if sequence:
+            # Keeps the id sequence alive when the old table is dropped
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {PARENT}.id")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"[Partition] Penukaran tabel gagal, {PARENT} tidak berubah (jalankan ulang migrate): {e}")
+        return False
+    print(f"[Partition] Tabel ditukar ({count} baris susulan). Tabel lama: {PARENT}{OLD_SUFFIX}")
+
+    if drop_old:
+        cur.execute(f"DROP TABLE {PARENT}{OLD_SUFFIX}")
+        conn.commit()
+        print(f"[Partition] {PARENT}{OLD_SUFFIX} dihapus.")
+    cur.execute(f"ANALYZE {PARENT}")
+    conn.commit()
+    cur.close()
+    return True
+
+
+def retain(db, conn, before_year, drop=False, compact=False, schema=None, lock_timeout=None):
+    """Takes yearly partitions older than before_year out of archived_documents; returns their names"""
+    schema = schema or os.environ.get("PARTITION_ARCHIVE_SCHEMA", "archive")
+    lock_timeout = lock_timeout or os.environ.get("PARTITION_LOCK_TIMEOUT", "5s")
+    cur = conn.cursor()
+    if not is_partitioned(cur):
+        print("[Partition] archived_documents belum dipartisi (python -m db.partition migrate).")
+        return []
+
+    removed = []
+    for year in partition_years(cur):
+        if year >= before_year:
+            continue
+        name = partition_name(year)
+        try:
+            # Same transaction as the detach, so /suggest never counts documents search cannot find;
+            # the SHARE lock keeps writes out of this one partition while its terms are counted
+            cur.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+            cur.execute(f"LOCK TABLE {name} IN SHARE MODE")
+            emptied = db._remove_table_terms(cur, name)
+            db._add_search_terms(cur, [], emptied)
+            cur.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+            db._bump_cache_generation(cur)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"[Partition] Gagal melepas {name} (coba lagi nanti): {e}")
+            break
+
+        if drop:
+            cur.execute(f"DROP TABLE {name}")
+            target = None
+        else:
+            cur.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+            cur.execute(f"ALTER TABLE {name} SET SCHEMA {schema}")
+            target = f"{schema}.{name}"
+            if compact:
+                # Archived years are not searched; the tsvectors and their GIN indexes are most of the size
+                cur.execute(f"ALTER TABLE {target} DROP COLUMN IF EXISTS search_id, DROP COLUMN IF EXISTS search_en")
+        conn.commit()
+        if target and compact:
+            conn.autocommit = True
+            try:
+                cur.execute(f"VACUUM FULL {target}")
+            finally:
+                conn.autocommit = False
+        removed.append(name)
+        print(f"[Partition] {name} {'dihapus' if drop else 'dipindah ke ' + target}.")
+    cur.close()
+    return removed
+
+
+def print_status(conn):
+    cur = conn.cursor()
+    if not is_partitioned(cur):
+        print("[Partition] archived_documents belum dipartisi.")
+        cur.close()
+        return
+    for name, bound, rows, size in partitions(cur):
+        print(f"  {name:<32} {max(rows, 0):>10} baris  {size / 1048576:>9.1f} MB  {bound}")
+    cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="daftar partisi, jumlah baris dan ukuran")
+    p = sub.add_parser("migrate", help="ubah archived_documents menjadi tabel berpartisi")
+    p.add_argument("--batch", type=int, default=int(os.environ.get("PARTITION_COPY_BATCH", 5000)),
+                   help="baris per transaksi saat menyalin")
+    p.add_argument("--drop-old", action="store_true", help="hapus tabel lama setelah berhasil ditukar")
+    sub.add_parser("ensure", help="buat partisi tahunan yang belum ada")
+    p = sub.add_parser("retain", help="lepas partisi lama dari archived_documents")
+    p.add_argument("--before", type=int, required=True, help="partisi dengan tahun < BEFORE dilepas")
+    p.add_argument("--drop", action="store_true", help="hapus partisi, bukan pindah ke schema arsip")
+    p.add_argument("--compact", action="store_true", help="buang kolom tsvector di salinan arsip + VACUUM FULL")
+    args = parser.parse_args()
+
+    from db.connector import DBConnector
+    db = DBConnector()
+    with db.connection() as conn:
+        if not conn:
+            raise SystemExit("Database tidak tersedia (DATABASE_URL).")
+        if args.command == "status":
+            print_status(conn)
+        elif args.command == "migrate":
+            migrate(conn, batch_size=args.batch, drop_old=args.drop_old)
+        elif args.command == "ensure":
+            created = ensure_partitions(conn)
+            print(f"[Partition] {len(created)} partisi baru: {created}")
+        else:
+            retain(db, conn, args.before, drop=args.drop, compact=args.compact)
+
+
+if __name__ == "__main__":
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    main()
@@ -0,0 +1,134 @@
+"""Shared PostgreSQL connection pool for the web app and the archivist pipeline.
+
+    from db.pool import connection
+
+    with connection() as conn:
+        if not conn:
+            return ...          # DATABASE_URL missing or database unreachable
+        cur = conn.cursor()
+        ...
+        conn.commit()
+
+Checked-out connections always go back to the pool (rolled back if the block
+left a transaction open or raised); broken ones are closed and replaced.
+
+Config: DB_POOL_MIN (1), DB_POOL_MAX (10), DB_POOL_TIMEOUT seconds to wait
+for a free connection (10), DB_POOL_CHECK_IDLE seconds of idleness after
+which a connection is pinged before use (30).
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+
+class ConnectionPool:
+    def __init__(self, dsn, minconn=None, maxconn=None, timeout=None, check_idle=None):
+        self.minconn = int(minconn or os.environ.get("DB_POOL_MIN", 1))
+        self.maxconn = max(self.minconn, int(maxconn or os.environ.get("DB_POOL_MAX", 10)))
+        self.timeout = float(timeout or os.environ.get("DB_POOL_TIMEOUT", 10))
+        self.check_idle = float(check_idle or os.environ.get("DB_POOL_CHECK_IDLE", 30))
+        self.pid = os.getpid()
+        self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, dsn)
+        # ThreadedConnectionPool raises when exhausted; the semaphore makes callers wait instead
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._last_used = {}
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.check_idle:
+            # Fresh or recently used connection
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"no free connection after {self.timeout}s (DB_POOL_MAX={self.maxconn})")
+        try:
+            # Stale server-side closes (idle timeout, failover) are dropped and replaced
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._healthy(conn):
+                    return conn
+                self._pool.putconn(conn, close=True)
+            raise psycopg2.OperationalError("could not get a healthy connection from the pool")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        broken = bool(conn.closed)
+        if not broken and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        self._last_used[id(conn)] = time.monotonic()
+        if broken:
+            self._last_used.pop(id(conn), None)
+        try:
+            self._pool.putconn(conn, close=broken)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn=None):
+    """One pool per DSN and per process (gunicorn workers must not share sockets)"""
+    dsn = dsn or os.environ.get("DATABASE_URL")
+    if not dsn:
+        return None
+    with _pools_lock:
+        pool = _pools.get(dsn)
+        if pool is None or pool.pid != os.getpid():
+            pool = ConnectionPool(dsn)
+            _pools[dsn] = pool
+        return pool
+
+
+@contextmanager
+def connection(dsn=None):
+    """Pooled connection, or None when the database is not configured/reachable"""
+    try:
+        pool = get_pool(dsn)
+        if pool is None:
+            print("[DB] Error: DATABASE_URL not set.")
+        conn = pool.getconn() if pool else None
+    except Exception as e:
+        print(f"[DB] Connection Error: {e}")
+        pool, conn = None, None
+
+    if conn is None:
+        yield None
+        return
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
@@ -11,11 +11,21 @@ CREATE TABLE IF NOT EXISTS archived_documents (
     CONSTRAINT archived_documents_url_ts_unique UNIQUE (original_url, archive_timestamp)
 );
 
--- Membuat GIN Index untuk Full-Text Search yang efisien
--- Menggunakan konfigurasi 'indonesian' untuk stemming dan stop words bahasa Indonesia.
--- Jika database tidak memiliki config 'indonesian' (defaultnya biasanya ada), fallback ke 'simple' atau 'english'.
--- Syntax: CREATE INDEX name ON table USING GIN (to_tsvector('config', column));
+-- Index Full-Text Search (GIN) dibuat lewat db/migrations/001_search_tsvector.sql:
+-- kolom tsvector tersimpan 'search_id' (indonesian) dan 'search_en' (english),
+-- diterapkan otomatis oleh DBConnector.apply_migrations() setelah schema ini.
+-- Kolom content_hash (md5 teks lengkap) + index (original_url, content_hash) untuk dedup
+-- snapshot identik: db/migrations/004_content_hash.sql, 008_content_hash_full_text.sql.
+-- Kolom cleaned_text_full (teks lengkap zstd/zlib, ARCHIVE_TEXT_STORAGE=compressed): db/migrations/007_cleaned_text_full.sql.
+-- Partisi per tahun archive_timestamp + retensi partisi lama: python -m db.partition (db/partition.py).
 
-CREATE INDEX IF NOT EXISTS idx_archived_documents_search 
-ON archived_documents 
-USING GIN (to_tsvector('indonesian', cleaned_text));
+-- Laporan URL mati dari extension / form komunitas (POST /submit-url, web/submissions.py).
+-- Status: PENDING -> PROCESSING (main.py) -> CONFIRMED_DEAD, atau dihapus bila URL ternyata hidup.
+CREATE TABLE IF NOT EXISTS reported_urls (
+    id SERIAL PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    source VARCHAR(50) DEFAULT 'unknown',
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+-- Index (created_at) dan (status, created_at) untuk feed terbaru: db/migrations/006_reported_urls_indexes.sql.
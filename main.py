@@ -1,7 +1,15 @@
 import os
 import sys
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+from archivist import metrics
+from archivist.checkpoint import PipelineState
 from archivist.collector import Collector
+from archivist.httpcache import HTTPCache
 from archivist.retriever import ArchiveRetriever
+from archivist.sessions import get_session
 from db.connector import DBConnector
 try:
     from dotenv import load_dotenv
@@ -9,7 +17,27 @@ try:
 except ImportError:
     pass
 
+def write_run_report(report, path):
+    """JSON run report to path (skipped if empty) and to the pipeline_runs table for /metrics"""
+    if path:
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"[Report] Run report disimpan ke {path}")
+        except Exception as e:
+            print(f"[Report] Gagal menulis run report: {e}")
+    DBConnector().save_run_report(report)
+
 def main():
+    parser = argparse.ArgumentParser(description="Nexus Ignis archive pipeline")
+    parser.add_argument("--resume", action="store_true",
+                        help="lanjutkan run sebelumnya yang terputus (skip URL yang sudah selesai)")
+    parser.add_argument("--bulk", action="store_true",
+                        help="insert lewat COPY + staging table (untuk backfill besar)")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=os.environ.get("PIPELINE_PROFILE"),
+                        help="profiling thread utama, hasil di data/profile.pstats atau data/profile.html")
+    args = parser.parse_args()
+
     print("=== STARTING ARCHIVE PIPELINE ===\n")
 
     # DEFINE PATHS
@@ -20,10 +48,38 @@ def main():
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
 
+    # Stage timers, counters and histograms of this run (archivist/metrics.py), written even if a stage fails
+    report_file = os.environ.get("RUN_REPORT", os.path.join(data_dir, "run_report.json"))
+    if report_file.lower() in ("0", "off"):
+        report_file = None
+    report = {"started_at": datetime.now(timezone.utc).isoformat(), "status": "failed", "bulk": args.bulk,
+              "resume": args.resume}
+    started = time.perf_counter()
+    try:
+        with metrics.profile(args.profile, data_dir):
+            run(args, base_dir, data_dir, report)
+        report["status"] = "ok"
+    finally:
+        report["finished_at"] = datetime.now(timezone.utc).isoformat()
+        report["duration_seconds"] = round(time.perf_counter() - started, 3)
+        report["metrics"] = metrics.REGISTRY.to_dict()
+        write_run_report(report, report_file)
+
+def run(args, base_dir, data_dir, report):
     # Input/Output Files
     seed_file = os.path.join(data_dir, "seed_list.txt")
     dead_urls_file = os.path.join(data_dir, "dead_urls.txt")
-    archive_json = os.path.join(data_dir, "archive_data.json")
+    # JSONL handoff Retriever -> DB (ARCHIVE_GZIP=1 untuk kompresi gzip)
+    archive_ext = ".jsonl.gz" if os.environ.get("ARCHIVE_GZIP") == "1" else ".jsonl"
+    archive_file = os.path.join(data_dir, "archive_data" + archive_ext)
+    state_file = os.environ.get("PIPELINE_STATE", os.path.join(data_dir, "pipeline_state.sqlite"))
+
+    # Checkpoint per URL; with --resume an unfinished run continues where it stopped
+    state = PipelineState(state_file, resume=args.resume)
+    if state.resumed:
+        print(f"[Resume] Melanjutkan run sebelumnya dari {state_file}")
+    elif args.resume:
+        print("[Resume] Tidak ada run yang terputus, mulai dari awal.")
 
     # Check if seed list exists, if not create dummy
     if not os.path.exists(seed_file):
@@ -40,55 +96,83 @@ def main():
         db_check.init_db(schema_path)
         # Fix uniqueness constraints
         db_check.fix_constraints()
+        # Yearly partitions for new snapshots (python -m db.partition migrate)
+        db_check.ensure_partitions()
     except Exception as e:
         print(f"[DB] Schema warning: {e}")
 
     # Sync Reports from DB to Seed List
     try:
-        from db.connector import DBConnector
         db_reports = DBConnector()
-        conn = db_reports.get_connection()
-        if conn:
-            cur = conn.cursor()
-            cur.execute("SELECT url FROM reported_urls WHERE status='PENDING'")
-            pending_urls = [row[0] for row in cur.fetchall()]
+        with db_reports.connection() as conn:
+            if conn:
+                cur = conn.cursor()
+                # A resumed run also picks up the reports its interrupted predecessor moved to PROCESSING
+                statuses = ('PENDING', 'PROCESSING') if state.resumed else ('PENDING',)
+                cur.execute("SELECT url FROM reported_urls WHERE status IN %s", (statuses,))
+                pending_urls = [row[0] for row in cur.fetchall()]
             
-            if pending_urls:
-                print(f"\n[Sync] Found {len(pending_urls)} pending reports in DB.")
-                with open(seed_file, "a", encoding="utf-8") as f:
-                    f.write("\n" + "\n".join(pending_urls))
-                print(f"[Sync] Added to seed_list.txt")
+                if pending_urls:
+                    print(f"\n[Sync] Found {len(pending_urls)} pending reports in DB.")
+                    with open(seed_file, "a", encoding="utf-8") as f:
+                        f.write("\n" + "\n".join(pending_urls))
+                    print(f"[Sync] Added to seed_list.txt")
                 
-                # Update status to PROCESSING
-                cur.execute("UPDATE reported_urls SET status='PROCESSING' WHERE status='PENDING'")
-                conn.commit()
+                    # Update status to PROCESSING
+                    cur.execute("UPDATE reported_urls SET status='PROCESSING' WHERE status='PENDING'")
+                    conn.commit()
                 
-            cur.close()
-            conn.close()
+                cur.close()
     except Exception as e:
         print(f"[Sync] Warning: Failed to sync DB reports: {e}")
     
+    # One keep-alive session for the whole run, shared by Collector and Retriever
+    session = get_session()
+
     # --- MODULE 1: COLLECTOR ---
     print("\n--- [1] COLLECTOR & VALIDATOR ---")
-    collector = Collector(seed_file, dead_urls_file)
-    if not collector.run():
+    collector = Collector(seed_file, dead_urls_file, state=state, session=session)
+    with metrics.stage("collect"):
+        collector_ok = collector.run()
+    report["probe"] = collector.probe.stats.snapshot()
+    if not collector_ok:
         print("Collector gagal. Menghentikan proses.")
         sys.exit(1)
 
     # --- MODULE 2: RETRIEVER ---
     print("\n--- [2] ARCHIVE RETRIEVER ---")
-    retriever = ArchiveRetriever(dead_urls_file, archive_json)
-    if not retriever.run():
+    # On-disk cache of Wayback responses; a re-run over known URLs barely touches the network
+    cache_file = os.environ.get("RETRIEVER_HTTP_CACHE", os.path.join(data_dir, "http_cache.sqlite"))
+    http_cache = None
+    if cache_file and cache_file.lower() not in ("0", "off"):
+        http_cache = HTTPCache(cache_file,
+                               max_bytes=int(float(os.environ.get("RETRIEVER_HTTP_CACHE_MB", 1024)) * 1024 * 1024),
+                               compress=os.environ.get("RETRIEVER_HTTP_CACHE_COMPRESS", "1") != "0")
+    retriever = ArchiveRetriever(dead_urls_file, archive_file, state=state, http_cache=http_cache, session=session)
+    with metrics.stage("retrieve"):
+        retriever_ok = retriever.run()
+    if http_cache is not None:
+        http_cache.close()
+    # The DB stage makes no HTTP requests; report connection reuse and close the pools now
+    session.print_metrics()
+    report["http_hosts"] = session.metrics.snapshot()
+    session.close()
+    if not retriever_ok:
         print("Retriever gagal. Menghentikan proses.")
         sys.exit(1)
 
     # --- MODULE 3: DB INDEXER ---
     print("\n--- [3] DB INSERTION ---")
     db = DBConnector()
-    if not db.insert_archive_data(archive_json):
+    insert = db.bulk_load_archive_data if args.bulk else db.insert_archive_data
+    with metrics.stage("insert"):
+        insert_ok = insert(archive_file, state=state)
+    if not insert_ok:
         print("Database insertion gagal.")
         sys.exit(1)
 
+    state.finish()
+    state.close()
     print("\n=== PIPELINE COMPLETED SUCCESSFULLY ===")
 
 if __name__ == "__main__":
@@ -54,7 +54,7 @@ REM Run the pipeline
 echo [STEP 2/3] Running archive pipeline...
 echo This will take 5-10 minutes. Please wait...
 echo.
-python main.py
+python main.py --bulk
 if errorlevel 1 (
     echo.
     echo [ERROR] Pipeline failed!
@@ -1,24 +1,29 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import psycopg2
+from flask import Flask, Response, g, render_template, request, jsonify
 import os
-import zipfile
-import tempfile
+import time
+from datetime import datetime
+from archivist import metrics
+from archivist.metrics import render_prometheus
+from db.connector import DBConnector
+from db.pool import connection
+from web.cache import SearchCache
+from web.extension import ExtensionPackage
+from web.feed import RecentFeed
+from web.search import search_documents, decode_cursor
+from web.submissions import QueueFull, SubmissionQueue, normalize_url
+from web.suggest import SuggestService
 
 app = Flask(__name__)
 
 def get_db_connection():
-    dsn = os.environ.get("DATABASE_URL")
-    if not dsn: return None
-    try:
-        return psycopg2.connect(dsn)
-    except Exception as e:
-        print(f"DB Error: {e}")
-        return None
+    """Pooled connection, use as `with get_db_connection() as conn:` (conn is None if the DB is unavailable)"""
+    return connection()
 
 def init_db():
     """Initializes the database using schema.sql"""
-    conn = get_db_connection()
-    if conn:
+    with get_db_connection() as conn:
+        if not conn:
+            return
         try:
             # Try multiple possible paths for schema.sql
             base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -44,85 +49,161 @@ def init_db():
             cur.execute(schema_sql)
             conn.commit()
             cur.close()
-            conn.close()
+            DBConnector().apply_migrations(conn)
             print("Database initialized successfully.")
         except Exception as e:
             print(f"DB Init Error: {e}")
 
+suggest_service = SuggestService(get_db_connection)
+search_cache = SearchCache(get_db_connection)
+recent_feed = RecentFeed(get_db_connection)
+extension_package = ExtensionPackage(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'extension'))
+submission_queue = SubmissionQueue(get_db_connection, on_flush=recent_feed.add)
+SUBMIT_RETRY_AFTER = int(os.environ.get("SUBMIT_RETRY_AFTER", 5))
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", 20))
+# Latest pipeline run report (pipeline_runs) is re-read from the DB at most this often
+PIPELINE_REPORT_TTL = float(os.environ.get("METRICS_PIPELINE_REPORT_TTL", 60))
+_pipeline_report = {"checked_at": None, "report": None}
+
 # Attempt to initialize DB on startup if URL is present (Cloud environment)
 if os.environ.get("DATABASE_URL"):
     with app.app_context():
         init_db()
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Endpoint name, not the path, keeps the label set small
+    endpoint = request.endpoint or "unmatched"
+    started = g.get("request_started")
+    if started is not None:
+        metrics.observe("request_seconds", time.perf_counter() - started, endpoint=endpoint)
+    metrics.inc("requests_total", endpoint=endpoint, status=str(response.status_code))
+    return response
+
+def latest_pipeline_report():
+    now = time.monotonic()
+    checked_at = _pipeline_report["checked_at"]
+    if checked_at is None or now - checked_at >= PIPELINE_REPORT_TTL:
+        _pipeline_report["report"] = DBConnector().latest_run_report()
+        _pipeline_report["checked_at"] = now
+    return _pipeline_report["report"]
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text format: this worker's request metrics plus the latest pipeline run report.
+
+    Each gunicorn worker keeps its own counters; scrape with a per-instance job or sum in queries.
+    """
+    metrics.gauge("submit_queue_pending", submission_queue.pending())
+    body = render_prometheus(metrics.REGISTRY.to_dict(), prefix="nexus_web_")
+    report = latest_pipeline_report()
+    if report:
+        body += render_prometheus(report.get("metrics", {}), prefix="nexus_pipeline_")
+        body += render_prometheus({
+            "last_run_duration_seconds": {"type": "gauge", "series": [
+                {"labels": {}, "value": report.get("duration_seconds", 0)}]},
+            "last_run_success": {"type": "gauge", "series": [
+                {"labels": {}, "value": int(report.get("status") == "ok")}]},
+            "last_run_timestamp_seconds": {"type": "gauge", "series": [
+                {"labels": {}, "value": datetime.fromisoformat(report["finished_at"]).timestamp()}]},
+        }, prefix="nexus_pipeline_")
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
 @app.route('/')
 def index():
-    recent_urls = []
-    conn = get_db_connection()
-    if conn:
-        try:
-            cur = conn.cursor()
-            cur.execute("SELECT url FROM reported_urls ORDER BY created_at DESC LIMIT 20;")
-            rows = cur.fetchall()
-            recent_urls = [row[0] for row in rows]
-            cur.close()
-            conn.close()
-        except Exception as e:
-            print(f"Error fetching recent urls: {e}")
-            if conn: conn.close()
-            
+    # Served from memory (web/feed.py); reloaded in the background, not per page view
+    recent_urls = recent_feed.recent_urls()
     return render_template('index.html', query="", results=[], recent_urls=recent_urls)
 
 @app.route('/about')
 def about():
     return render_template('about.html')
 
+def year_arg(name):
+    """Capture year from ?year_from= / ?year_to=; None if missing or implausible"""
+    try:
+        year = int(request.args.get(name, ''))
+    except ValueError:
+        return None
+    return year if 1990 <= year <= 2100 else None
+
 @app.route('/search')
 def search():
     query = request.args.get('q', '')
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+    # Optional capture-year range; lets the planner prune yearly partitions (db/partition.py)
+    year_from, year_to = year_arg('year_from'), year_arg('year_to')
     results = []
+    has_next = False
     
-    if query:
-        conn = get_db_connection()
-        if conn:
+    generation, cached = search_cache.get(query, "page", page, year_from, year_to) if query else (None, None)
+    if cached is not None:
+        results, has_next = cached
+    elif query:
+        with get_db_connection() as conn:
+            if conn:
+                try:
+                    # Multi-language Full Text Search (Indonesian + English)
+                    # Ranked on the stored search_id / search_en vectors first; ts_headline only runs
+                    # for the rows of this page, in the matched language (web/search.py)
+                    results, next_cursor = search_documents(conn, query, limit=SEARCH_PAGE_SIZE,
+                                                            offset=(page - 1) * SEARCH_PAGE_SIZE,
+                                                            year_from=year_from, year_to=year_to)
+                    has_next = next_cursor is not None
+                    search_cache.set(generation, query, (results, has_next), "page", page, year_from, year_to)
+                except Exception as e:
+                    print(f"Search Error: {e}")
+
+    return render_template('search_results.html', query=query, results=results, page=page, has_next=has_next,
+                           year_from=year_from, year_to=year_to)
+
+@app.route('/api/search')
+def api_search():
+    """JSON search with keyset paging: pass back `next_cursor` as ?cursor= for the following page.
+
+    ?year_from= / ?year_to= limit results to those capture years (keep them for every page of a cursor).
+    """
+    query = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor') or None
+    try:
+        limit = min(max(1, int(request.args.get('limit', SEARCH_PAGE_SIZE))), 100)
+    except ValueError:
+        limit = SEARCH_PAGE_SIZE
+    year_from, year_to = year_arg('year_from'), year_arg('year_to')
+    if not query:
+        return jsonify({"results": [], "next_cursor": None})
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"error": "invalid cursor"}), 400
+
+    generation, page = search_cache.get(query, "cursor", cursor, limit, year_from, year_to)
+    if page is None:
+        with get_db_connection() as conn:
+            if not conn:
+                return jsonify({"error": "Database error"}), 500
             try:
-                cur = conn.cursor()
-                # Multi-language Full Text Search (Indonesian + English)
-                sql = """
-                    SELECT original_url, 
-                           ts_headline('indonesian', cleaned_text, plainto_tsquery('indonesian', %s)) as snippet_id,
-                           ts_headline('english', cleaned_text, plainto_tsquery('english', %s)) as snippet_en,
-                           archive_timestamp,
-                           category
-                    FROM archived_documents
-                    WHERE 
-                        to_tsvector('indonesian', cleaned_text) @@ plainto_tsquery('indonesian', %s)
-                        OR
-                        to_tsvector('english', cleaned_text) @@ plainto_tsquery('english', %s)
-                    ORDER BY 
-                        (ts_rank(to_tsvector('indonesian', cleaned_text), plainto_tsquery('indonesian', %s)) +
-                         ts_rank(to_tsvector('english', cleaned_text), plainto_tsquery('english', %s))) DESC
-                    LIMIT 20;
-                """
-                # Params: query, query, query, query, query, query
-                cur.execute(sql, (query, query, query, query, query, query))
-                
-                rows = cur.fetchall()
-                for row in rows:
-                    # Choose the best snippet (if indonesian snippet is empty, use english)
-                    snippet = row[1] if "<b>" in str(row[1]) else row[2]
-                    
-                    results.append({
-                        "original_url": row[0],
-                        "snippet": snippet,
-                        "archive_timestamp": row[3],
-                        "category": row[4] if len(row) > 4 else "General"
-                    })
-                cur.close()
-                conn.close()
+                page = search_documents(conn, query, limit=limit, cursor=cursor,
+                                        year_from=year_from, year_to=year_to)
+                search_cache.set(generation, query, page, "cursor", cursor, limit, year_from, year_to)
             except Exception as e:
                 print(f"Search Error: {e}")
+                return jsonify({"error": "Server error"}), 500
 
-    return render_template('search_results.html', query=query, results=results)
+    results, next_cursor = page
+    return jsonify({
+        "results": [dict(r, archive_timestamp=r["archive_timestamp"].isoformat() if r["archive_timestamp"] else None)
+                    for r in results],
+        "next_cursor": next_cursor,
+    })
 
 @app.route('/suggest')
 def suggest():
@@ -130,150 +211,66 @@ def suggest():
     if not q or len(q) < 2:
         return jsonify([])
 
+    # Prefix lookup in the in-memory term index (web/suggest.py); no DB query per keystroke
     suggestions = []
-    conn = get_db_connection()
-    if conn:
-        try:
-            cur = conn.cursor()
-            # Gunakan ts_stat untuk mencari kata-kata yang paling sering muncul
-            # yang diawali dengan huruf yang diketik user (prefix match)
-            sql = """
-                SELECT word 
-                FROM ts_stat('SELECT to_tsvector(''indonesian'', cleaned_text) FROM archived_documents') 
-                WHERE word ILIKE %s 
-                ORDER BY nentry DESC 
-                LIMIT 5;
-            """
-            cur.execute(sql, (q + '%',))
-            rows = cur.fetchall()
-            suggestions = [row[0] for row in rows]
-            cur.close()
-            conn.close()
-        except Exception as e:
-            print(f"Suggestion Error: {e}")
+    try:
+        suggestions = suggest_service.suggest(q, limit=5)
+    except Exception as e:
+        print(f"Suggestion Error: {e}")
             
     return jsonify(suggestions)
 
 @app.route('/api/recent-urls')
 def get_recent_urls():
-    """API endpoint to get recent reported URLs from DB"""
-    recent_urls = []
-    conn = get_db_connection()
-    if conn:
-        try:
-            cur = conn.cursor()
-            # Get PENDING and CONFIRMED_DEAD, prioritizing Dead ones
-            # If user wants strictly "after execution", we should focus on CONFIRMED_DEAD
-            # But to show liveliness, we show PENDING too with a status indicator logic in frontend if needed.
-            # For now, let's fetch valid ones.
-            cur.execute("""
-                SELECT url, status 
-                FROM reported_urls 
-                WHERE status IN ('PENDING', 'CONFIRMED_DEAD') 
-                ORDER BY 
-                    CASE WHEN status = 'CONFIRMED_DEAD' THEN 1 ELSE 2 END, 
-                    created_at DESC 
-                LIMIT 20;
-            """)
-            rows = cur.fetchall()
-            # Just return URL list for now to match frontend expectation
-            recent_urls = [row[0] for row in rows]
-            cur.close()
-            conn.close()
-        except Exception as e:
-            print(f"Error fetching recent urls: {e}")
-            if conn: conn.close()
-    
-    return jsonify({"urls": recent_urls})
+    """API endpoint to get recent reported URLs (CONFIRMED_DEAD first, then PENDING), served from memory"""
+    return jsonify({"urls": recent_feed.feed_urls()})
 
 @app.route('/submit-url', methods=['POST'])
 def submit_url():
-    """API endpoint for receiving dead URL submissions from extension or community"""
+    """API endpoint for receiving dead URL submissions from extension or community.
+
+    Only queues the URL (web/submissions.py); a background writer inserts it into reported_urls.
+    """
+    data = request.get_json(silent=True) or {}
+    url = normalize_url(data.get('url') if isinstance(data.get('url'), str) else None)
+    # 'extension' or 'community'; control characters (NUL) could never be written
+    source = "".join(ch for ch in str(data.get('source') or 'unknown') if ch.isprintable())[:50] or 'unknown'
+
+    if not data.get('url'):
+        return jsonify({"success": False, "message": "URL is required"}), 400
+    if not url:
+        return jsonify({"success": False, "message": "Invalid URL"}), 400
+
     try:
-        data = request.get_json()
-        url = data.get('url', '').strip()
-        source = data.get('source', 'unknown')  # 'extension' or 'community'
-        
-        if not url:
-            return jsonify({"success": False, "message": "URL is required"}), 400
-        
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"success": False, "message": "Database error"}), 500
+        result = submission_queue.submit(url, source)
+    except QueueFull:
+        print(f"[Submit] Queue penuh, {url} ditolak (429)")
+        response = jsonify({"success": False, "message": "Server busy, please try again later"})
+        response.headers["Retry-After"] = str(SUBMIT_RETRY_AFTER)
+        return response, 429
 
-        try:
-            cur = conn.cursor()
-            # Try insert, ignore if duplicate
-            cur.execute("""
-                INSERT INTO reported_urls (url, source, status) 
-                VALUES (%s, %s, 'PENDING')
-                ON CONFLICT (url) DO NOTHING;
-            """, (url, source))
-            
-            rows_affected = cur.rowcount
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            if rows_affected > 0:
-                print(f"[Submit] New URL added from {source}: {url}")
-                return jsonify({"success": True, "message": "URL submitted successfully"})
-            else:
-                print(f"[Submit] Duplicate URL from {source}: {url}")
-                return jsonify({"success": True, "message": "URL already in queue"})
-                
-        except Exception as e:
-            print(f"[Submit] DB Error: {e}")
-            if conn: conn.close()
-            return jsonify({"success": False, "message": "Server error"}), 500
-            
-    except Exception as e:
-        print(f"[Submit] Error: {e}")
-        return jsonify({"success": False, "message": "Server error"}), 500
+    if result == "duplicate":
+        return jsonify({"success": True, "message": "URL already in queue"})
+    return jsonify({"success": True, "message": "URL submitted successfully"}), 202
 
 @app.route('/download-extension')
 def download_extension():
-    """Serve the browser extension for download"""
+    """Serve the browser extension for download (built once per base URL, web/extension.py)"""
     try:
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        extension_dir = os.path.join(base_dir, 'extension')
-        
-        # Create a temporary ZIP file
-        temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-        
-        with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(extension_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, extension_dir)
-                    
-                    # Dynamically update config.js with current server URL
-                    if file == 'config.js':
-                        # Get current base URL (e.g., https://my-app.railway.app/)
-                        base_url = request.url_root.rstrip('/')
-                        api_url = f"{base_url}/submit-url"
-                        
-                        # Create new config content
-                        config_content = f"""
-// Auto-generated config
-const CONFIG = {{
-    API_URL: '{api_url}'
-}};
-
-if (typeof module !== 'undefined' && module.exports) {{
-    module.exports = CONFIG;
-}}
-"""
-                        zipf.writestr(arcname, config_content)
-                    else:
-                        zipf.write(file_path, arcname)
-        
-        return send_file(
-            temp_zip.name,
-            as_attachment=True,
-            download_name='nexus-ignis-extension.zip',
-            mimetype='application/zip'
-        )
+        # Get current base URL (e.g., https://my-app.railway.app/)
+        base_url = request.url_root.rstrip('/')
+        # Repeat download: answer 304 from the ETag alone
+        etag = extension_package.etag(base_url)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            etag, data = extension_package.get(base_url)
+            response = Response(data, mimetype='application/zip')
+            response.headers['Content-Disposition'] = 'attachment; filename=nexus-ignis-extension.zip'
+        response.set_etag(etag)
+        # Browsers revalidate every time, which is a cheap 304 while nothing changed
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         print(f"[Download] Error: {e}")
         return "Extension not found", 404
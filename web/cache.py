@@ -0,0 +1,146 @@
+"""Result cache for /search, invalidated by a generation counter in the database.
+
+Entries are keyed on (generation, normalized query, ...). Every upsert in
+DBConnector.insert_archive_data bumps cache_generation, so after an ingest
+all old keys become unreachable and simply age out of the LRU/TTL.
+The generation is read on every request by default (a primary-key lookup),
+so the first request after an ingest commits already misses. With
+SEARCH_CACHE_GENERATION_CHECK=N it is re-read at most every N seconds, and
+pre-ingest pages can be served for up to N seconds after the commit.
+
+Backends: in-process LRU (default) or a Redis-compatible server
+(SEARCH_CACHE_BACKEND=redis, REDIS_URL; needs the optional `redis` package).
+"""
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from archivist import metrics
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def normalize_query(query):
+    # plainto_tsquery is case-insensitive and ignores extra whitespace, so these share results
+    return " ".join(query.lower().split())
+
+
+class LocalCache:
+    """Thread-safe LRU with per-entry TTL"""
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class RedisCache:
+    """Shared between gunicorn workers; eviction is left to Redis (maxmemory-policy allkeys-lru)"""
+    def __init__(self, url, ttl, prefix="nexus:search:"):
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=int(self.ttl))
+
+
+def make_backend():
+    size = int(os.environ.get("SEARCH_CACHE_SIZE", 1000))
+    ttl = float(os.environ.get("SEARCH_CACHE_TTL", 300))
+    if os.environ.get("SEARCH_CACHE_BACKEND", "memory").lower() == "redis":
+        if redis is None:
+            print("[Cache] Paket redis tidak terinstall, pakai cache lokal.")
+        else:
+            return RedisCache(os.environ.get("REDIS_URL", "redis://localhost:6379/0"), ttl)
+    return LocalCache(size, ttl)
+
+
+class SearchCache:
+    def __init__(self, connection, backend=None, check_seconds=None):
+        # Factory returning a pooled-connection context manager (db.pool.connection)
+        self.connection = connection
+        self.backend = backend or make_backend()
+        if check_seconds is None:
+            check_seconds = os.environ.get("SEARCH_CACHE_GENERATION_CHECK", 0)
+        self.check_seconds = float(check_seconds)
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        """Current cache_generation; with check_seconds > 0 re-read from the DB at most that often"""
+        with self._lock:
+            if self._generation is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._generation
+        generation = None
+        try:
+            with self.connection() as conn:
+                if conn:
+                    cur = conn.cursor()
+                    cur.execute("SELECT generation FROM cache_generation WHERE name = 'archived_documents';")
+                    row = cur.fetchone()
+                    cur.close()
+                    generation = row[0] if row else None
+        except Exception as e:
+            print(f"[Cache] Generation Error: {e}")
+        with self._lock:
+            self._generation = generation
+            self._checked_at = time.monotonic()
+        return generation
+
+    def _key(self, generation, query, parts):
+        return ":".join([str(generation), normalize_query(query)] + [str(p) for p in parts])
+
+    def get(self, query, *parts):
+        """(generation, cached value or None); pass the generation on to set() after a miss"""
+        # Unknown generation (DB down, table missing): bypass the cache rather than risk stale pages
+        generation = self.generation()
+        if generation is None:
+            metrics.inc("search_cache_total", result="bypass")
+            return None, None
+        try:
+            value = self.backend.get(self._key(generation, query, parts))
+        except Exception as e:
+            print(f"[Cache] Get Error: {e}")
+            value = None
+        metrics.inc("search_cache_total", result="miss" if value is None else "hit")
+        return generation, value
+
+    def set(self, generation, query, value, *parts):
+        # Stored under the generation read before the query ran: an ingest committing in between
+        # must not label pre-ingest results with its new generation
+        if generation is None:
+            return
+        try:
+            self.backend.set(self._key(generation, query, parts), value)
+        except Exception as e:
+            print(f"[Cache] Set Error: {e}")
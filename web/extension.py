@@ -0,0 +1,113 @@
+"""Builds the browser extension ZIP for /download-extension once and keeps it in memory.
+
+The ZIP differs per base URL only in config.js (API_URL points back at the
+server that served it), so archives are cached per (extension files, base
+URL) in a small LRU (EXTENSION_ZIP_CACHE entries). The key doubles as the
+ETag: a repeat download with If-None-Match is a 304 without any rebuild.
+Files are re-hashed only when their size or mtime changes, so an updated
+extension/ directory is picked up without a restart.
+"""
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+CONFIG_TEMPLATE = """
+// Auto-generated config
+const CONFIG = {{
+    API_URL: '{api_url}'
+}};
+
+if (typeof module !== 'undefined' && module.exports) {{
+    module.exports = CONFIG;
+}}
+"""
+
+# Already compressed; deflating them again only costs CPU
+STORED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".zip")
+# Fixed entry timestamps, so the same inputs always give the same bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class ExtensionPackage:
+    def __init__(self, extension_dir, max_entries=None):
+        self.extension_dir = extension_dir
+        self.max_entries = max(1, int(max_entries or os.environ.get("EXTENSION_ZIP_CACHE", 4)))
+        self._lock = threading.Lock()
+        self._archives = OrderedDict()
+        self._signature = None
+        self._digest = None
+
+    def _files(self):
+        files = []
+        for root, dirs, names in os.walk(self.extension_dir):
+            dirs.sort()
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                files.append((os.path.relpath(path, self.extension_dir).replace(os.sep, "/"), path))
+        return files
+
+    def _files_digest(self, files):
+        """Hash of the extension files; recomputed only when a size or mtime changed"""
+        signature = []
+        for arcname, path in files:
+            st = os.stat(path)
+            signature.append((arcname, st.st_size, st.st_mtime_ns))
+        signature = tuple(signature)
+        with self._lock:
+            if signature == self._signature:
+                return self._digest
+        digest = hashlib.sha256()
+        for arcname, path in files:
+            digest.update(arcname.encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        digest = digest.hexdigest()
+        with self._lock:
+            self._signature, self._digest = signature, digest
+        return digest
+
+    def _build(self, files, api_url):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for arcname, path in files:
+                info = zipfile.ZipInfo(arcname, ZIP_DATE_TIME)
+                info.external_attr = 0o644 << 16
+                if arcname == "config.js":
+                    # Dynamically update config.js with current server URL
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    zipf.writestr(info, CONFIG_TEMPLATE.format(api_url=api_url))
+                    continue
+                info.compress_type = (zipfile.ZIP_STORED if arcname.lower().endswith(STORED_EXTENSIONS)
+                                      else zipfile.ZIP_DEFLATED)
+                with open(path, "rb") as f:
+                    zipf.writestr(info, f.read())
+        return buffer.getvalue()
+
+    def _key(self, base_url):
+        files = self._files()
+        if not files:
+            raise FileNotFoundError(self.extension_dir)
+        digest = self._files_digest(files)
+        return files, hashlib.sha256(f"{digest}\0{base_url}".encode("utf-8")).hexdigest()[:32]
+
+    def etag(self, base_url):
+        """ETag of the archive for base_url, without building it"""
+        return self._key(base_url)[1]
+
+    def get(self, base_url):
+        """(etag, zip bytes) for an extension whose API_URL points at base_url"""
+        files, key = self._key(base_url)
+        with self._lock:
+            data = self._archives.get(key)
+            if data is not None:
+                self._archives.move_to_end(key)
+                return key, data
+        data = self._build(files, f"{base_url}/submit-url")
+        with self._lock:
+            self._archives[key] = data
+            while len(self._archives) > self.max_entries:
+                self._archives.popitem(last=False)
+        return key, data
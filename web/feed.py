@@ -0,0 +1,104 @@
+"""In-memory "recent reports" feed for the homepage and /api/recent-urls.
+
+Both lists are loaded from reported_urls in one round trip and kept for
+RECENT_FEED_TTL seconds; after that the next request still gets the old
+lists while a background thread reloads them, so page views never wait on
+the database. URLs written by the /submit-url writer are pushed to the front
+right away (add()), and status changes made by the pipeline show up at
+the next reload. The indexes in db/migrations/006_reported_urls_indexes.sql
+keep a reload to a few index scans.
+"""
+import os
+import threading
+import time
+
+FEED_SIZE = 20
+
+# Newest reports of any status (homepage sidebar)
+RECENT_SQL = "SELECT url FROM reported_urls ORDER BY created_at DESC LIMIT %(limit)s"
+
+# Confirmed dead first, then pending, newest first within each; one index range scan per status
+FEED_SQL = """
+    (SELECT url, status FROM reported_urls WHERE status = 'CONFIRMED_DEAD' ORDER BY created_at DESC LIMIT %(limit)s)
+    UNION ALL
+    (SELECT url, status FROM reported_urls WHERE status = 'PENDING' ORDER BY created_at DESC LIMIT %(limit)s)
+"""
+
+
+class RecentFeed:
+    def __init__(self, connection, ttl=None, size=FEED_SIZE):
+        # Factory returning a pooled-connection context manager (db.pool.connection)
+        self.connection = connection
+        self.ttl = float(ttl or os.environ.get("RECENT_FEED_TTL", 30))
+        self.size = size
+        self.recent = None
+        self.dead = []
+        self.pending = []
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._loading = False
+
+    def _load(self):
+        with self.connection() as conn:
+            if not conn:
+                return None
+            cur = conn.cursor()
+            cur.execute(RECENT_SQL, {"limit": self.size})
+            recent = [row[0] for row in cur.fetchall()]
+            cur.execute(FEED_SQL, {"limit": self.size})
+            rows = cur.fetchall()
+            cur.close()
+        dead = [url for url, status in rows if status == "CONFIRMED_DEAD"]
+        pending = [url for url, status in rows if status == "PENDING"]
+        return recent, dead, pending
+
+    def _reload(self):
+        try:
+            loaded = self._load()
+            if loaded is not None:
+                with self._lock:
+                    self.recent, self.dead, self.pending = loaded
+                    self.loaded_at = time.monotonic()
+        except Exception as e:
+            print(f"Error fetching recent urls: {e}")
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def refresh(self, wait=False):
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        if wait:
+            self._reload()
+        else:
+            threading.Thread(target=self._reload, daemon=True).start()
+
+    def _current(self):
+        if self.recent is None:
+            # First request loads synchronously, later ones never wait
+            self.refresh(wait=True)
+        elif time.monotonic() - self.loaded_at > self.ttl:
+            self.refresh()
+
+    def recent_urls(self):
+        """Newest reported URLs, any status"""
+        self._current()
+        return list(self.recent or [])
+
+    def feed_urls(self):
+        """Confirmed dead URLs first, then pending ones (the /api/recent-urls order)"""
+        self._current()
+        with self._lock:
+            return (self.dead + self.pending)[:self.size]
+
+    def add(self, urls):
+        """Newly inserted PENDING reports (newest last), shown without waiting for a reload"""
+        with self._lock:
+            if self.recent is None:
+                return
+            new = list(reversed(urls))
+            added = set(new)
+            self.recent = (new + [u for u in self.recent if u not in added])[:self.size]
+            self.pending = (new + [u for u in self.pending if u not in added])[:self.size]
@@ -0,0 +1,114 @@
+"""Full-text search over archived_documents, ranked first and highlighted last.
+
+ts_headline re-parses the whole cleaned_text and is by far the most
+expensive part of a search, so the query works in stages:
+
+    matches  rank every hit from the stored search_id/search_en vectors
+             (GIN index scans, cleaned_text is never read here)
+    page     sort + LIMIT/OFFSET or keyset cursor, limit + 1 rows
+    top      the rows that are actually shown
+    final    join back by primary key and build one headline per row, in
+             the language whose vector matched (Indonesian wins a tie)
+
+With ARCHIVE_TEXT_STORAGE=compressed, cleaned_text is the bounded search
+body (archivist/textstore.py), so a headline never parses more than
+ARCHIVE_SEARCH_CHARS characters.
+
+Paging: `offset` for numbered pages (/search?page=N), or an opaque `cursor`
+returned with each page (/api/search) which continues right after the last
+row without re-sorting the rows already shown.
+
+Years: year_from / year_to (capture years, inclusive) become a constant
+archive_timestamp range in both scans of archived_documents, so on the
+partitioned table (db/partition.py) the planner prunes every other year's
+partition and its GIN indexes. Without them all partitions are searched.
+"""
+from datetime import datetime, timezone
+
+SEARCH_SQL = """
+    WITH matches AS (
+        SELECT d.id,
+               ts_rank(d.search_id, q_id) + ts_rank(d.search_en, q_en) AS rank,
+               d.search_id @@ q_id AS match_id
+        FROM archived_documents d,
+             plainto_tsquery('indonesian', %(q)s) q_id,
+             plainto_tsquery('english', %(q)s) q_en
+        WHERE (d.search_id @@ q_id OR d.search_en @@ q_en) AND {years}
+    ), page AS (
+        SELECT id, rank, match_id
+        FROM matches
+        WHERE {after}
+        ORDER BY rank DESC, id DESC
+        LIMIT %(limit)s + 1 OFFSET %(offset)s
+    ), top AS (
+        SELECT * FROM page ORDER BY rank DESC, id DESC LIMIT %(limit)s
+    )
+    SELECT d.original_url,
+           CASE WHEN t.match_id
+                THEN ts_headline('indonesian', d.cleaned_text, plainto_tsquery('indonesian', %(q)s))
+                ELSE ts_headline('english', d.cleaned_text, plainto_tsquery('english', %(q)s))
+           END AS snippet,
+           d.archive_timestamp,
+           d.category,
+           t.rank,
+           t.id,
+           (SELECT count(*) FROM page) > %(limit)s AS has_more
+    FROM top t
+    JOIN archived_documents d ON d.id = t.id AND {years}
+    ORDER BY t.rank DESC, t.id DESC;
+"""
+
+# Rows strictly after the cursor in (rank DESC, id DESC) order
+AFTER_CURSOR = "(rank < %(rank)s::real OR (rank = %(rank)s::real AND id < %(id)s))"
+
+
+def year_range(year_from=None, year_to=None):
+    """(SQL condition on d.archive_timestamp, params) for capture years year_from..year_to, either may be None"""
+    conditions, params = [], {}
+    if year_from is not None:
+        conditions.append("d.archive_timestamp >= %(since)s")
+        params["since"] = datetime(year_from, 1, 1, tzinfo=timezone.utc)
+    if year_to is not None:
+        conditions.append("d.archive_timestamp < %(until)s")
+        params["until"] = datetime(year_to + 1, 1, 1, tzinfo=timezone.utc)
+    return " AND ".join(conditions) or "TRUE", params
+
+
+def encode_cursor(rank, doc_id):
+    # repr() round-trips the float4 rank exactly, so ties on rank are resolved by id
+    return f"{rank!r}_{doc_id}"
+
+
+def decode_cursor(cursor):
+    """(rank, id) from a cursor string; ValueError if it is malformed"""
+    rank, _, doc_id = cursor.rpartition("_")
+    return float(rank), int(doc_id)
+
+
+def search_documents(conn, query, limit=20, offset=0, cursor=None, year_from=None, year_to=None):
+    """One page of results for query, optionally only captures from year_from..year_to.
+
+    Returns (results, next_cursor); next_cursor is None on the last page.
+    """
+    years, params = year_range(year_from, year_to)
+    params.update({"q": query, "limit": limit, "offset": offset})
+    after = "TRUE"
+    if cursor:
+        params["rank"], params["id"] = decode_cursor(cursor)
+        params["offset"] = 0
+        after = AFTER_CURSOR
+
+    cur = conn.cursor()
+    cur.execute(SEARCH_SQL.format(after=after, years=years), params)
+    rows = cur.fetchall()
+    cur.close()
+
+    results = [{
+        "original_url": row[0],
+        "snippet": row[1],
+        "archive_timestamp": row[2],
+        "category": row[3] or "General",
+    } for row in rows]
+
+    next_cursor = encode_cursor(rows[-1][4], rows[-1][5]) if rows and rows[-1][6] else None
+    return results, next_cursor
@@ -0,0 +1,212 @@
+"""Non-blocking intake for /submit-url.
+
+Submissions are normalized, deduplicated in memory and put on a bounded
+queue; a background thread writes them to reported_urls in multi-row
+INSERT ... ON CONFLICT DO NOTHING batches (every SUBMIT_BATCH_SIZE URLs or
+SUBMIT_FLUSH_SECONDS, whichever comes first). The request never waits for
+Postgres. When the queue is full, submit() raises QueueFull and the endpoint
+answers 429. If the database is down, the writer keeps the batch and retries,
+so a long outage ends in backpressure instead of lost reports. A row the
+database can never accept (ValueError, DataError) is bisected out of its batch
+and dropped, so it cannot stall the writer.
+
+Each gunicorn worker has its own queue and writer thread.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from archivist import metrics
+
+MAX_URL_LENGTH = 2048
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Retrying cannot fix these (NUL byte, value too long for its column, ...); the bad row is bisected out
+NON_TRANSIENT_ERRORS = (ValueError, psycopg2.DataError, psycopg2.IntegrityError)
+
+
+class QueueFull(Exception):
+    pass
+
+
+def normalize_url(url):
+    """Canonical form used for dedup and storage, or None for anything that is not an http(s) URL"""
+    url = (url or "").strip()
+    # Browsers percent-encode spaces and control characters; raw ones mean this is not a URL
+    # (and PostgreSQL text cannot hold NUL at all)
+    if not url or len(url) > MAX_URL_LENGTH or any(ch.isspace() or unicodedata.category(ch) == "Cc" for ch in url):
+        return None
+    if "://" not in url:
+        url = "http://" + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if ":" in host:
+        host = f"[{host}]"
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    # Fragments never reach the server, so they do not make a different page
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+class SubmissionQueue:
+    def __init__(self, connection, maxsize=None, batch_size=None, flush_seconds=None, dedup_size=None,
+                 on_flush=None):
+        # Factory returning a pooled-connection context manager (db.pool.connection)
+        self.connection = connection
+        # Called with the newly inserted URLs after each flush (e.g. RecentFeed.add)
+        self.on_flush = on_flush
+        self.maxsize = int(maxsize or os.environ.get("SUBMIT_QUEUE_SIZE", 10000))
+        self.batch_size = max(1, int(batch_size or os.environ.get("SUBMIT_BATCH_SIZE", 500)))
+        self.flush_seconds = float(flush_seconds or os.environ.get("SUBMIT_FLUSH_SECONDS", 1.0))
+        self.dedup_size = int(dedup_size or os.environ.get("SUBMIT_DEDUP_SIZE", 100000))
+        self._queue = queue.Queue(maxsize=self.maxsize)
+        # Recently accepted URLs (queued or already written), oldest first
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        atexit.register(self.close)
+
+    def _ensure_writer(self):
+        # Started lazily in the process that serves requests (gunicorn forks after import)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="submit-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, url, source):
+        """Returns "queued" or "duplicate"; raises QueueFull when the writer is behind"""
+        with self._lock:
+            if url in self._seen:
+                self._seen.move_to_end(url)
+                metrics.inc("submissions_total", result="duplicate")
+                return "duplicate"
+            try:
+                self._queue.put_nowait((url, source))
+            except queue.Full:
+                metrics.inc("submissions_total", result="rejected")
+                raise QueueFull()
+            self._seen[url] = None
+            if len(self._seen) > self.dedup_size:
+                self._seen.popitem(last=False)
+        metrics.inc("submissions_total", result="queued")
+        self._ensure_writer()
+        return "queued"
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _take_batch(self):
+        """Blocks for the first item, then collects until batch_size or flush_seconds"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_seconds)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        with self.connection() as conn:
+            if not conn:
+                raise RuntimeError("database unavailable")
+            try:
+                cur = conn.cursor()
+                inserted = execute_values(cur, """
+                    INSERT INTO reported_urls (url, source, status)
+                    VALUES %s
+                    ON CONFLICT (url) DO NOTHING
+                    RETURNING url
+                """, batch, template="(%s, %s, 'PENDING')", page_size=self.batch_size, fetch=True)
+                conn.commit()
+                cur.close()
+            except Exception:
+                conn.rollback()
+                raise
+        return [row[0] for row in inserted]
+
+    def flush(self, batch):
+        """Writes one batch; returns False (batch not written, retry later) on a transient database error"""
+        started = time.perf_counter()
+        try:
+            inserted = self._write(batch)
+        except NON_TRANSIENT_ERRORS as e:
+            metrics.inc("submit_flush_total", result="rejected")
+            if len(batch) == 1:
+                print(f"[Submit] URL dibuang, tidak bisa disimpan: {batch[0][0]!r} ({e})")
+                metrics.inc("submit_rows_total", result="dropped")
+                # Nothing was stored, so a resubmission must not be answered as a duplicate
+                with self._lock:
+                    self._seen.pop(batch[0][0], None)
+                return True
+            # Halve until the offending row is alone; the rest of the batch is still written
+            middle = len(batch) // 2
+            return self.flush(batch[:middle]) and self.flush(batch[middle:])
+        except Exception as e:
+            print(f"[Submit] DB Error, batch {len(batch)} URL dicoba lagi: {e}")
+            metrics.inc("submit_flush_total", result="error")
+            return False
+        metrics.inc("submit_flush_total", result="ok")
+        metrics.observe("submit_flush_seconds", time.perf_counter() - started)
+        metrics.inc("submit_rows_total", len(inserted), result="inserted")
+        metrics.inc("submit_rows_total", len(batch) - len(inserted), result="existing")
+        print(f"[Submit] {len(inserted)} URL baru disimpan, {len(batch) - len(inserted)} sudah ada.")
+        if inserted and self.on_flush is not None:
+            try:
+                self.on_flush(inserted)
+            except Exception as e:
+                print(f"[Submit] on_flush Error: {e}")
+        return True
+
+    def _run(self):
+        batch = []
+        backoff = self.flush_seconds
+        while True:
+            if not batch:
+                if self._stop.is_set() and self._queue.empty():
+                    return
+                batch = self._take_batch()
+                if not batch:
+                    continue
+            if self.flush(batch):
+                batch = []
+                backoff = self.flush_seconds
+            elif self._stop.is_set():
+                return
+            else:
+                # Queue keeps filling meanwhile; once full, submit() pushes back with 429
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def close(self, timeout=5.0):
+        """Flushes what is queued (best effort, used at interpreter exit)"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
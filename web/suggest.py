@@ -0,0 +1,105 @@
+"""In-memory prefix index for /suggest, loaded from the search_terms table.
+
+search_terms is kept up to date by DBConnector.insert_archive_data; the web
+app only reads it, and reloads it in the background every SUGGEST_REFRESH
+seconds. Lookups never touch the database.
+"""
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Prefixes up to this length get their top results precomputed (their ranges are huge)
+PRECOMPUTED_PREFIX_LEN = 3
+
+
+class TermIndex:
+    def __init__(self, limit=5):
+        self.limit = limit
+        self.words = []
+        self.counts = []
+        self.top = {}
+
+    @classmethod
+    def from_rows(cls, rows, limit=5):
+        """rows: iterable of (word, nentry)"""
+        index = cls(limit)
+        ranked = sorted(((w.lower(), n) for w, n in rows), key=lambda r: r[1], reverse=True)
+
+        # Most frequent first, so the first `limit` words seen per short prefix are its top results
+        for word, _ in ranked:
+            for length in range(1, min(len(word), PRECOMPUTED_PREFIX_LEN) + 1):
+                bucket = index.top.setdefault(word[:length], [])
+                if len(bucket) < limit:
+                    bucket.append(word)
+
+        ranked.sort(key=lambda r: r[0])
+        index.words = [w for w, _ in ranked]
+        index.counts = [n for _, n in ranked]
+        return index
+
+    def lookup(self, prefix, limit=None):
+        limit = min(limit or self.limit, self.limit)
+        prefix = prefix.lower()
+        if len(prefix) <= PRECOMPUTED_PREFIX_LEN:
+            return self.top.get(prefix, [])[:limit]
+
+        lo = bisect_left(self.words, prefix)
+        hi = bisect_left(self.words, prefix + "\uffff", lo)
+        best = heapq.nlargest(limit, range(lo, hi), key=self.counts.__getitem__)
+        return [self.words[i] for i in best]
+
+
+class SuggestService:
+    """Holds the current TermIndex and swaps in a fresh one when it gets old"""
+    def __init__(self, connection, refresh_seconds=None, max_terms=None):
+        # Factory returning a pooled-connection context manager (db.pool.connection)
+        self.connection = connection
+        self.refresh_seconds = float(refresh_seconds or os.environ.get("SUGGEST_REFRESH", 300))
+        self.max_terms = int(max_terms or os.environ.get("SUGGEST_MAX_TERMS", 200000))
+        self.index = None
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._loading = False
+
+    def _load(self):
+        with self.connection() as conn:
+            if not conn:
+                return None
+            cur = conn.cursor()
+            cur.execute("SELECT word, nentry FROM search_terms ORDER BY nentry DESC LIMIT %s;", (self.max_terms,))
+            rows = cur.fetchall()
+            cur.close()
+        return TermIndex.from_rows(rows)
+
+    def _reload(self):
+        try:
+            index = self._load()
+            if index is not None:
+                self.index = index
+                self.loaded_at = time.monotonic()
+        except Exception as e:
+            print(f"Suggestion Index Error: {e}")
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def refresh(self, wait=False):
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        if wait:
+            self._reload()
+        else:
+            threading.Thread(target=self._reload, daemon=True).start()
+
+    def suggest(self, prefix, limit=5):
+        if self.index is None:
+            # First request loads synchronously, later ones never wait
+            self.refresh(wait=True)
+        elif time.monotonic() - self.loaded_at > self.refresh_seconds:
+            self.refresh()
+        index = self.index
+        return index.lookup(prefix, limit) if index else []